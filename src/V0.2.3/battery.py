@@ -108,6 +108,15 @@ class BQ27441:
     def temp_C(self):       
         return self._rd_word(0x02)*0.1 - 273.15
 
+    # Integer variants of the above, avoiding soft-float on the RP2040
+    def voltage_mV(self):
+        return self._rd_word(0x04)
+
+    def temp_0_1C(self):
+        # 0.1 K to 0.1 degC, truncated toward zero like int(temp_C() * 10)
+        t = 2 * self._rd_word(0x02) - 5463   # 0.05 degC units
+        return t // 2 if t >= 0 else -(-t // 2)
+
     def avg_current_mA(self):
         raw = self._rd_word(0x10)
         return raw - 0x10000 if raw & 0x8000 else raw
@@ -4,6 +4,8 @@
 #Description: This is the main program for the RP2040 SAM
 
 import machine
+import micropython
+from micropython import const
 import utime
 from eink_driver_sam import einkDSP_SAM
 import _thread
@@ -13,43 +15,133 @@ from pamir_uart_protocols import PamirUartProtocols
 from neopixel_controller import NeoPixelController
 from power_manager import PowerManager
 
-pmic_enable = machine.Pin(3, machine.Pin.IN, pull=None)
+# GPIO assignments
+_PMIC_EN_PIN = const(3)
+_SAM_INT_PIN = const(2)
+_UART_TX_PIN = const(4)
+_UART_RX_PIN = const(5)
+_EINK_STATUS_PIN = const(9)
+_BTN_SELECT_PIN = const(16)
+_BTN_UP_PIN = const(17)
+_BTN_DOWN_PIN = const(18)
+_NEOPIXEL_PIN = const(20)
+_EINK_MUX_PIN = const(22)
+_USB_SWITCH_S_PIN = const(23)
+
+_WDT_TIMEOUT_MS = const(2000)
+_WDT_FEED_MS = const(500)
+_IDLE_MS = const(5)  # Core 0 main loop sleep when no work is pending
+# Debounce time in milliseconds
+_DEBOUNCE_MS = const(50)
+# UP+SELECT hold: poll period, when shutdown packets start, when USB switches
+_BTN_HOLD_POLL_MS = const(50)
+_BTN_HOLD_SHUTDOWN_MS = const(2000)
+_BTN_HOLD_USBSWITCH_MS = const(10000)
+
+_PACKET_SIZE = const(4)  # Every UART protocol packet is 4 bytes
+
+# Last time_value of each LED animation mode band (0 is static)
+_MODE_BLINK_MAX = const(5)
+_MODE_FADE_MAX = const(10)
+_MODE_RAINBOW_MAX = const(15)
+
+pmic_enable = machine.Pin(_PMIC_EN_PIN, machine.Pin.IN, pull=None)
 
-PRODUCTION = True  #for production flash, set to true for usb debug
-UART_DEBUG = False #for UART debug, set to true for UART debug
+# Build flags as const() so the compiler drops the disabled branches entirely:
+# an `if` on a const 0 is not compiled at all, leaving no runtime check
+_PRODUCTION = const(1)  # 1 for production flash, 0 for usb debug
+_DEBUG = const(1 - _PRODUCTION)  # Debug prints, gated with `if _DEBUG:`
+_UART_DEBUG = const(0)  # 1 to also send debug messages over UART
 
 # Initialize protocol handler
 protocol = PamirUartProtocols()
 
-USB_SWITCH_TABLE = {"SAM_USB": [0,0], "SOM_USB": [1,0]} # S, OE_N
+# Protocol constants used per packet, bound once as module globals to skip
+# the attribute lookup on every dispatch
+_TYPE_BUTTON = protocol.TYPE_BUTTON
+_TYPE_LED = protocol.TYPE_LED
+_TYPE_POWER = protocol.TYPE_POWER
+_TYPE_SYSTEM = protocol.TYPE_SYSTEM
+_POWER_STATE_OFF = protocol.POWER_STATE_OFF
+_POWER_STATE_RUNNING = protocol.POWER_STATE_RUNNING
+_POWER_CMD_CURRENT = protocol.POWER_CMD_CURRENT
+_POWER_CMD_BATTERY = protocol.POWER_CMD_BATTERY
+_POWER_CMD_TEMP = protocol.POWER_CMD_TEMP
+_POWER_CMD_VOLTAGE = protocol.POWER_CMD_VOLTAGE
+_POWER_CMD_QUERY = protocol.POWER_CMD_QUERY
+_POWER_CMD_SET = protocol.POWER_CMD_SET
+_POWER_CMD_SLEEP = protocol.POWER_CMD_SLEEP
+_POWER_CMD_SHUTDOWN = protocol.POWER_CMD_SHUTDOWN
+_POWER_CMD_REQUEST_METRICS = protocol.POWER_CMD_REQUEST_METRICS
+_SYSTEM_CMD_PING = protocol.SYSTEM_CMD_PING
+_SYSTEM_CMD_VERSION = protocol.SYSTEM_CMD_VERSION
+_SYSTEM_CMD_RESET = protocol.SYSTEM_CMD_RESET
+_LED_KIND_EXECUTE = protocol.LED_KIND_EXECUTE
+
+# LED command record fields
+K_KIND = protocol.K_KIND
+K_LED = protocol.K_LED
+K_COLOR = protocol.K_COLOR
+K_TIME = protocol.K_TIME
+
+# Bound packet builders/parsers used on every packet or LED callback
+# RX ring slots only ever hold packets _drain() validated, so skip the checksum
+_decode = protocol.decode_trusted
+_create_led_completion_packet = protocol.create_led_completion_packet
+_create_led_error_packet = protocol.create_led_error_packet
+_create_power_status_packet = protocol.create_power_status_packet_rp2040_to_som
+_fill_power_status_packet = protocol.create_power_status_packet_into
+_fill_power_metrics_packet = protocol.create_power_metrics_packet_into
+
+# Core 0 power reply buffers, refilled in place for every reply. uart2.write()
+# has queued the bytes by the time it returns, so reuse is safe.
+_POWER_TX = bytearray(4)
+_METRICS_TX = bytearray(16)
+_METRICS_TX_MV = memoryview(_METRICS_TX)
+_METRICS_TX_VIEWS = tuple(_METRICS_TX_MV[i:i + 4] for i in range(0, 16, 4))
+
+# Fixed packets built once instead of on every send
+_SHUTDOWN_PKT = _create_power_status_packet(_POWER_STATE_OFF, 0x00)
+_PONG_PKT = protocol.create_system_pong_packet()
+_VERSION_PKT = protocol.create_firmware_version_packet()
+# Button packet for each 4-bit pressed mask (protocol BTN_* bit layout)
+_BTN_TABLE = protocol.BUTTON_PACKETS
+
+# USB switch targets, used as indices into USB_SWITCH_S
+SAM_USB = const(0)
+SOM_USB = const(1)
+USB_SWITCH_S = (0, 1) # S level per target (OE_N is always 0)
 # usb_switch_oe_n = machine.Pin(19, machine.Pin.OUT, value = 0)
-usb_switch_s = machine.Pin(23, machine.Pin.OUT, value = 0)
+usb_switch_s = machine.Pin(_USB_SWITCH_S_PIN, machine.Pin.OUT, value = 0)
 
 def switch_usb(usb_type):
-    if usb_type in USB_SWITCH_TABLE:
-        S, _ = USB_SWITCH_TABLE[usb_type]
-        usb_switch_s.value(S)
-        # usb_switch_oe_n.value(OE_N)
+    if 0 <= usb_type < len(USB_SWITCH_S):
+        usb_switch_s.value(USB_SWITCH_S[usb_type])
+        # usb_switch_oe_n.value(0)
     else:
         print(f"Invalid USB type: {usb_type}")
 
 
-wdt = WDT(timeout=2000)
+wdt = WDT(timeout=_WDT_TIMEOUT_MS)
+# Liveness flags: the Core 0 main loop and the Core 1 loop each set theirs on
+# every pass, and the watchdog timer below only feeds when both were set
+core0_alive = True
+core1_alive = True
+# Shared flag to coordinate thread handoff
+thread_handoff_complete = False
 # Set up GPIO pins
-selectBTN = machine.Pin(16, machine.Pin.IN, machine.Pin.PULL_DOWN)
-upBTN = machine.Pin(17, machine.Pin.IN, machine.Pin.PULL_DOWN)
-downBTN = machine.Pin(18, machine.Pin.IN, machine.Pin.PULL_DOWN)
-einkStatus = machine.Pin(9, machine.Pin.OUT)
-einkMux = machine.Pin(22, machine.Pin.OUT)
-sam_interrupt = machine.Pin(2, machine.Pin.OUT)
-# Debounce time in milliseconds
-debounce_time = 50
-
-if PRODUCTION:
-    switch_usb("SOM_USB") # Disable SAM USB
+selectBTN = machine.Pin(_BTN_SELECT_PIN, machine.Pin.IN, machine.Pin.PULL_DOWN)
+upBTN = machine.Pin(_BTN_UP_PIN, machine.Pin.IN, machine.Pin.PULL_DOWN)
+downBTN = machine.Pin(_BTN_DOWN_PIN, machine.Pin.IN, machine.Pin.PULL_DOWN)
+einkStatus = machine.Pin(_EINK_STATUS_PIN, machine.Pin.OUT)
+einkMux = machine.Pin(_EINK_MUX_PIN, machine.Pin.OUT)
+sam_interrupt = machine.Pin(_SAM_INT_PIN, machine.Pin.OUT)
+
+if _PRODUCTION:
+    switch_usb(SOM_USB) # Disable SAM USB
     
 # Setup UART2 on GPIO4 (TX) and GPIO5 (RX) - matches CM5 UART2 connection
-uart2 = machine.UART(0, baudrate=115200, tx=machine.Pin(4), rx=machine.Pin(5))
+uart2 = machine.UART(0, baudrate=115200, tx=machine.Pin(_UART_TX_PIN), rx=machine.Pin(_UART_RX_PIN))
 einkMux.low()  # EINK OFF
 einkStatus.low()  # SOM CONTROL E-INK
 
@@ -57,7 +149,7 @@ print("Starting...")
 
 # Function to handle UART debug messages
 def debug_print(message):
-    if UART_DEBUG:
+    if _UART_DEBUG:
         uart2.write(message)
     print(message)
 
@@ -65,214 +157,327 @@ def debug_print(message):
 # Add lock for shared variable
 eink_lock = _thread.allocate_lock()
 einkRunning = False
-uart_lock = _thread.allocate_lock()  # Add lock for UART handling
-
-# Inter-core communication queues
-led_command_queue = []
-led_queue_lock = _thread.allocate_lock()
+# UART RX is single-owner by Core 1 and needs no lock. TX is multi-writer and
+# guarded by uart_lock; button packets are the exception, they are written
+# whole from the debounce timer callback, which could otherwise re-enter a held lock.
+uart_lock = _thread.allocate_lock()
+
+# Parsed command queues. Both ends run on Core 0 (filled by drain_rx_packets()
+# and emptied later in the same main loop pass), so they need no lock.
+LED_QUEUE_SIZE = const(32)  # Fixed ring of command slots, power of two for index masking
+led_command_queue = [None] * LED_QUEUE_SIZE
+led_queue_head = 0
+led_queue_tail = 0
 
 power_command_queue = []
-power_queue_lock = _thread.allocate_lock()
+
+class SPSCRing:
+    """Fixed ring of 4-byte packet slots for one producer and one consumer
+    
+    Only the producer writes head and only the consumer writes tail, so the
+    two sides can run on different cores without a lock.
+    """
+    
+    def __init__(self, slots):
+        """Initialize the ring
+        
+        Args:
+            slots: Number of packet slots, a power of two
+        """
+        self.buf = bytearray(slots * _PACKET_SIZE)
+        self.mask = slots - 1
+        self.head = 0
+        self.tail = 0
+        # One 4-byte memoryview per slot, sliced once so popping doesn't allocate
+        mv = memoryview(self.buf)
+        self.slots = [mv[i * _PACKET_SIZE:(i + 1) * _PACKET_SIZE] for i in range(slots)]
+
+# Raw packet ring from Core 1 (UART RX) to Core 0 (parse + dispatch). Core 1
+# only queues validated raw packets, so all parser allocations stay on Core 0.
+RX_SLOTS = const(16)  # Power of two: _drain() wraps the head with RX_SLOTS - 1
+rx_ring = SPSCRing(RX_SLOTS)
+
+# Core 1 UART receive buffer: bytes are read straight into it with readinto()
+# and consumed by index, so the receive path never allocates. Each pass leaves
+# at most a partial packet at the front, so reads only ever start at offsets
+# 0-3 and the view for each is sliced once here.
+RX_BUF = bytearray(256)
+RX_MV = memoryview(RX_BUF)
+RX_READ_VIEWS = tuple(RX_MV[i:] for i in range(_PACKET_SIZE))
+
+# Core 1 sleeps on this lock until the UART RX IRQ releases it. UART.irq()
+# only exists on rp2 from MicroPython 1.24, so older firmware keeps polling.
+UART_RX_IRQ = hasattr(machine.UART, 'IRQ_RXIDLE')
+rx_event = _thread.allocate_lock()
+rx_event.acquire()
+
+# Core 0 work signal, released by Core 1 when it queues RX packets and by the
+# button IRQ. Core 0 still has to watch the button levels for the UP+SELECT
+# hold, so rather than blocking on it the main loop checks it after each pass
+# and only sleeps when nothing new arrived meanwhile.
+core0_event = _thread.allocate_lock()
+core0_event.acquire()
+
+def wake_core0():
+    """Signal the Core 0 main loop that there is work pending"""
+    # Core 1 and the button IRQ on Core 0 may both wake at once, and a
+    # second release of the lock raises
+    try:
+        core0_event.release()
+    except RuntimeError:
+        pass  # Already signalled
+
+def uart_rx_handler(uart):
+    """UART RX IRQ handler: wake Core 1 to drain the received bytes"""
+    try:
+        rx_event.release()
+    except RuntimeError:
+        pass  # Already signalled
+
+def wdt_tick(t):
+    """Feed the watchdog only if both cores' loops ran since the last tick"""
+    global core0_alive, core1_alive
+    # The boot animation blocks in e-ink busy waits for seconds at a time, so
+    # Core 1 is only held to the timeout once it reaches its UART loop
+    if core0_alive and (core1_alive or not thread_handoff_complete):
+        wdt.feed()
+    core0_alive = core1_alive = False
+    if UART_RX_IRQ:
+        uart_rx_handler(None)  # Core 1 may be parked on rx_event; let it check in
+
+# Feed from a periodic timer, well inside the 2 s timeout, so the loops can
+# block for a while without feeding it themselves. A loop that hangs stops
+# setting its flag, and the watchdog then resets the board.
+wdt_timer = machine.Timer(period=_WDT_FEED_MS, mode=machine.Timer.PERIODIC, callback=wdt_tick)
+
+# Preallocated LED command records, reused round-robin so LED packets don't
+# allocate. One RX drain parses fewer than RX_SLOTS packets and the LED queue
+# is emptied right after it, so a record is never reused while still queued.
+LED_POOL_SIZE = const(RX_SLOTS)
+led_command_pool = [protocol.new_led_command() for _ in range(LED_POOL_SIZE)]
+led_pool_index = 0
 
 # LED completion callback function
 def led_completion_callback(led_id, sequence_length):
     """Callback function called when LED animations complete"""
-    global protocol, uart2, uart_lock, PRODUCTION
+    global protocol, uart2, uart_lock
     
     try:
-        with uart_lock:
-            if sequence_length > 0:
-                # Send completion acknowledgment
-                packet = protocol.create_led_completion_packet(led_id, sequence_length)
+        if sequence_length > 0:
+            # Send completion acknowledgment
+            packet = _create_led_completion_packet(led_id, sequence_length)
+            with uart_lock:
                 uart2.write(packet)
                 uart2.flush()  # Ensure immediate transmission
-                if not PRODUCTION:
-                    print(f"LED completion ACK sent: LED{led_id}, {sequence_length} commands")
-            elif sequence_length < 0:
-                # Send error report (sequence_length is negative error code)
-                error_code = abs(sequence_length)
-                packet = protocol.create_led_error_packet(led_id, error_code)
+            if _DEBUG:
+                print(f"LED completion ACK sent: LED{led_id}, {sequence_length} commands")
+        elif sequence_length < 0:
+            # Send error report (sequence_length is negative error code)
+            error_code = abs(sequence_length)
+            packet = _create_led_error_packet(led_id, error_code)
+            with uart_lock:
                 uart2.write(packet)
                 uart2.flush()  # Ensure immediate transmission
-                if not PRODUCTION:
-                    print(f"LED error ACK sent: LED{led_id}, error {error_code}")
+            if _DEBUG:
+                print(f"LED error ACK sent: LED{led_id}, error {error_code}")
     except Exception as e:
         print(f"LED acknowledgment failed: {e}")
 
 # Initialize controllers
-np_controller = NeoPixelController(pin=20, num_leds=1, default_brightness=0.5, 
+np_controller = NeoPixelController(pin=_NEOPIXEL_PIN, num_leds=1, default_brightness=0.5, 
                                    completion_callback=led_completion_callback)
 
+# LED animation mode for each 4-bit time_value:
+# 0 = static, 1-5 = blink, 6-10 = fade, 11-15 = rainbow
+# (bytes rather than a tuple: 16 bytes of storage, and indexing yields an int)
+_MODE_LUT = bytes((np_controller.MODE_STATIC,) +
+                  (np_controller.MODE_BLINK,) * _MODE_BLINK_MAX +
+                  (np_controller.MODE_FADE,) * (_MODE_FADE_MAX - _MODE_BLINK_MAX) +
+                  (np_controller.MODE_RAINBOW,) * (_MODE_RAINBOW_MAX - _MODE_FADE_MAX))
+
 # Initialize power manager with BQ27441 (3000mAh design capacity)
-power_manager = PowerManager(design_capacity_mah=3000, debug_enabled=not PRODUCTION)
+power_manager = PowerManager(design_capacity_mah=3000, debug_enabled=bool(_DEBUG))
 
 def add_led_command_to_queue(command):
-    """Thread-safe function to add LED command to inter-core queue"""
-    global led_command_queue
-    with led_queue_lock:
-        led_command_queue.append(command)
-
-def get_led_commands_from_queue():
-    """Thread-safe function to get all LED commands from queue"""
-    global led_command_queue
-    with led_queue_lock:
-        commands = led_command_queue.copy()
-        led_command_queue.clear()
-        return commands
+    """Add LED command to the Core 0 LED queue"""
+    global led_queue_tail
+    next_tail = (led_queue_tail + 1) & (LED_QUEUE_SIZE - 1)
+    if next_tail == led_queue_head:
+        return False  # Queue full, drop the command
+    led_command_queue[led_queue_tail] = command
+    led_queue_tail = next_tail
+    return True
 
 def add_power_command_to_queue(command):
-    """Thread-safe function to add power command to inter-core queue"""
-    global power_command_queue
-    with power_queue_lock:
-        power_command_queue.append(command)
+    """Add power command to the Core 0 power queue"""
+    power_command_queue.append(command)
 
 def get_power_commands_from_queue():
-    """Thread-safe function to get all power commands from queue"""
+    """Take all queued power commands, leaving a fresh queue"""
     global power_command_queue
-    with power_queue_lock:
-        commands = power_command_queue.copy()
-        power_command_queue.clear()
-        return commands
-
+    commands = power_command_queue
+    if commands:
+        # Only swap in a new list when there was something to take, so idle
+        # main loop passes don't allocate
+        power_command_queue = []
+    return commands
+
+@micropython.viper
+def _drain(buf: ptr8, n: int, ring: ptr8, head_tail: int) -> int:
+    """Validate every whole packet in buf[0:n] and copy the good ones into the
+    RX ring buffer, given its (head << 8 | tail). Packets with a bad checksum,
+    or arriving while the ring is full, are skipped. Returns the new head"""
+    # Viper takes at most 4 arguments, hence the packed ring indices
+    head = head_tail >> 8
+    tail = head_tail & 0xFF
+    pos = 0
+    while n - pos >= _PACKET_SIZE:
+        type_flags = int(buf[pos])
+        data0 = int(buf[pos + 1])
+        data1 = int(buf[pos + 2])
+        checksum = int(buf[pos + 3])
+        # Same check as pamir_uart_protocols.validate4(), inlined to save a call
+        if (type_flags ^ data0 ^ data1) == checksum:
+            next_head = (head + 1) & (RX_SLOTS - 1)
+            if next_head != tail:
+                offset = head << 2
+                ring[offset] = type_flags
+                ring[offset + 1] = data0
+                ring[offset + 2] = data1
+                ring[offset + 3] = checksum
+                head = next_head
+        pos += _PACKET_SIZE
+    return head
+
+@micropython.native
 def process_uart_packet(packet_bytes):
     """Process received UART packet and queue appropriate commands"""
-    packet_type = protocol.get_packet_type(packet_bytes)
+    global led_pool_index
+    # Parse only, _drain() checked the checksum; LED packets land in the next
+    # pooled record
+    packet_type, data = _decode(packet_bytes, led_command_pool[led_pool_index])
     
-    if packet_type == protocol.TYPE_LED:
-        # Parse LED packet
-        valid, led_data = protocol.parse_led_packet(packet_bytes)
-        if valid:
-            # Add to LED command queue for core 0 to process
-            add_led_command_to_queue(led_data)
-            if not PRODUCTION:
-                print(f"LED command queued: {led_data}")
-        else:
-            # Try parsing as LED acknowledgment/status request
-            valid_ack, ack_data = protocol.parse_led_acknowledgment(packet_bytes)
-            if valid_ack and ack_data['type'] == 'status':
-                # Handle LED status request
-                add_led_command_to_queue({
-                    'type': 'status_request',
-                    'led_id': ack_data['led_id'],
-                    'status_code': ack_data['status_code']
-                })
-                if not PRODUCTION:
-                    print(f"LED status request: {ack_data}")
+    if packet_type == _TYPE_LED:
+        led_pool_index = (led_pool_index + 1) % LED_POOL_SIZE
+        # Add to LED command queue for core 0 to process
+        if add_led_command_to_queue(data):
+            if _DEBUG:
+                print(f"LED command queued: {data}")
+        elif _DEBUG:
+            print("LED queue full, command dropped")
     
-    elif packet_type == protocol.TYPE_POWER:
-        # Parse power packet (SoM → RP2040 commands)
-        valid, power_data = protocol.parse_power_packet(packet_bytes)
-        if valid:
-            # Add to power command queue for core 0 to process
-            add_power_command_to_queue(power_data)
-            if not PRODUCTION:
-                print(f"Power command queued: {power_data}")
-        else:
-            if not PRODUCTION:
-                print(f"Invalid power packet: {[hex(b) for b in packet_bytes]}")
+    elif packet_type == _TYPE_POWER:
+        # Power packet (SoM → RP2040 commands)
+        add_power_command_to_queue(data)
+        if _DEBUG:
+            print(f"Power command queued: {data}")
     
-    elif packet_type == protocol.TYPE_BUTTON:
+    elif packet_type == _TYPE_BUTTON:
         # Handle button packets if needed (currently only send, not receive)
         pass
     
-    elif packet_type == protocol.TYPE_SYSTEM:
-        # Parse system packet (SoM → RP2040 system commands)
-        valid, system_data = protocol.parse_system_packet(packet_bytes)
-        if valid:
-            cmd_type = system_data.get('command', 'unknown')
-            
-            if cmd_type == 'ping':
-                # Respond to ping with pong
-                try:
-                    with uart_lock:
-                        pong_packet = protocol.create_system_pong_packet()
-                        uart2.write(pong_packet)
-                        uart2.flush()  # Ensure immediate transmission
-                        if not PRODUCTION:
-                            print("Ping received, pong sent")
-                except Exception as e:
-                    print(f"Failed to send pong: {e}")
-            
-            elif cmd_type == 'version_request':
-                # Send firmware version response
-                try:
-                    with uart_lock:
-                        version_packet = protocol.create_firmware_version_packet()
-                        uart2.write(version_packet)
-                        uart2.flush()  # Ensure immediate transmission
-                        if not PRODUCTION:
-                            print(f"Version sent: {protocol.FIRMWARE_VERSION_MAJOR}.{protocol.FIRMWARE_VERSION_MINOR}.{protocol.FIRMWARE_VERSION_PATCH}")
-                except Exception as e:
-                    print(f"Failed to send version: {e}")
-            
-            elif cmd_type == 'reset':
-                # Handle reset command
-                reset_type = system_data.get('reset_type', 0)
-                if not PRODUCTION:
-                    print(f"Reset command received: type={reset_type}")
-                # TODO: Implement actual reset logic based on reset_type
-            
-            else:
-                if not PRODUCTION:
-                    print(f"Unknown system command: {cmd_type}")
+    elif packet_type == _TYPE_SYSTEM:
+        # System packet (SoM → RP2040 system commands)
+        cmd_type, data0, data1 = data
+        
+        if cmd_type == _SYSTEM_CMD_PING:
+            # Respond to ping with pong
+            try:
+                with uart_lock:
+                    uart2.write(_PONG_PKT)
+                if _DEBUG:
+                    print("Ping received, pong sent")
+            except Exception as e:
+                print(f"Failed to send pong: {e}")
+        
+        elif cmd_type == _SYSTEM_CMD_VERSION:
+            # Send firmware version response
+            try:
+                with uart_lock:
+                    uart2.write(_VERSION_PKT)
+                if _DEBUG:
+                    print(f"Version sent: {protocol.FIRMWARE_VERSION_MAJOR}.{protocol.FIRMWARE_VERSION_MINOR}.{protocol.FIRMWARE_VERSION_PATCH}")
+            except Exception as e:
+                print(f"Failed to send version: {e}")
+        
+        elif cmd_type == _SYSTEM_CMD_RESET:
+            # Handle reset command
+            reset_type = data0
+            if _DEBUG:
+                print(f"Reset command received: type={reset_type}")
+            # TODO: Implement actual reset logic based on reset_type
+        
         else:
-            if not PRODUCTION:
-                print(f"Invalid system packet: {[hex(b) for b in packet_bytes]}")
+            if _DEBUG:
+                print(f"Unknown system command: {cmd_type}")
+    
+    elif packet_type is None:
+        if _DEBUG:
+            print(f"Invalid packet: {[hex(b) for b in packet_bytes]}")
     
     else:
-        if not PRODUCTION:
+        if _DEBUG:
             print(f"Unknown packet type: 0x{packet_type:02X}")
 
 
 
 
-# Function to debounce button press
-def debounce(pin):
-    state = pin.value()
-    utime.sleep_ms(debounce_time)
-    if pin.value() != state:
-        return False
-    return True
+def drain_rx_packets():
+    """Parse and dispatch the packets queued by Core 1 (Core 0 only)"""
+    ring = rx_ring
+    slots = ring.slots
+    mask = ring.mask
+    head = ring.head  # Snapshot so one drain never laps the LED command pool
+    tail = ring.tail
+    while tail != head:
+        process_uart_packet(slots[tail])
+        tail = (tail + 1) & mask
+        ring.tail = tail  # Hand the slot back to Core 1
 
-def get_debounced_state(pin):
-    return pin.value() and debounce(pin) 
+# One-shot debounce timer: every button edge restarts it, and it samples the
+# buttons once they have been quiet for _DEBOUNCE_MS
+_btn_timer = machine.Timer()
 
 def send_button_state():
-    # Get current button states with debouncing
-    up_pressed = get_debounced_state(upBTN)
-    down_pressed = get_debounced_state(downBTN)
-    select_pressed = get_debounced_state(selectBTN)
-    power_pressed = False  # Power button logic handled separately
+    # Get current button states (edges are debounced by _btn_timer).
+    # Power button logic is handled separately, so its bit stays clear.
+    mask = upBTN.value() | (downBTN.value() << 1) | (selectBTN.value() << 2)
     
-    # Create protocol packet according to Pamir UART specification
-    packet = protocol.create_button_packet(
-        up_pressed=up_pressed,
-        down_pressed=down_pressed, 
-        select_pressed=select_pressed,
-        power_pressed=power_pressed
-    )
+    # Prebuilt protocol packet according to Pamir UART specification
+    packet = _BTN_TABLE[mask]
     
-    if not PRODUCTION:
+    if _DEBUG:
         print(f"Button packet: {[hex(b) for b in packet]}")
-        print(f"Button states - UP: {up_pressed}, DOWN: {down_pressed}, SELECT: {select_pressed}")
+        print(f"Button states - UP: {bool(mask & 1)}, DOWN: {bool(mask & 2)}, SELECT: {bool(mask & 4)}")
     
     uart2.write(packet)
     uart2.flush()  # Ensure immediate transmission
 
-# Interrupt handler for down button
+def _send_button_state_cb(_):
+    send_button_state()
+
+# Interrupt handler for all buttons: (re)arm the debounce timer, which sends
+# the settled state out of IRQ context
 def button_handler(pin):
-    if debounce(pin):
-        send_button_state()
+    _btn_timer.init(mode=machine.Timer.ONE_SHOT, period=_DEBOUNCE_MS,
+                    callback=_send_button_state_cb)
+    wake_core0()
 
 def loading_terminator(pin):
     #Reserved for future use
     pass
 
+def attach_button_irqs():
+    for pin in (selectBTN, upBTN, downBTN):
+        pin.irq(trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING, handler=button_handler)
+
+def detach_button_irqs():
+    for pin in (selectBTN, upBTN, downBTN):
+        pin.irq(handler=None)
+
 
 # Set up interrupt handlers
-selectBTN.irq(trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING, handler=button_handler)
-upBTN.irq(trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING, handler=button_handler)
-downBTN.irq(trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING, handler=button_handler)
+attach_button_irqs()
 sam_interrupt.irq(trigger=machine.Pin.IRQ_RISING, handler=loading_terminator)
 
 debug_print(f"[RP2040 DEBUG] Initialized NeoPixel Controller\n")
@@ -289,113 +494,129 @@ debug_print("StartScreen\n")
 def send_boot_notification():
     """Send boot notification FROM RP2040 TO SoM to indicate RP2040 is running"""
     try:
+        # Send power status packet indicating we're running
+        packet = _create_power_status_packet(
+            _POWER_STATE_RUNNING, 0x00)
         with uart_lock:
-            # Send power status packet indicating we're running
-            packet = protocol.create_power_status_packet_rp2040_to_som(
-                protocol.POWER_STATE_RUNNING, 0x00)
             uart2.write(packet)
             # Ensure packet is transmitted immediately
             uart2.flush()
-            if not PRODUCTION:
-                print("[Boot] Boot notification sent to SoM")
+        if _DEBUG:
+            print("[Boot] Boot notification sent to SoM")
     except Exception as e:
         print(f"[Boot] Failed to send boot notification: {e}")
 
 # Boot notification will be sent after UART reception starts
 
-# Shared flag to coordinate thread handoff
-thread_handoff_complete = False
-
 # Thread to handle both eink and UART tasks
+@micropython.native
+def receive_uart(write_pos):
+    """Read pending UART bytes into RX_BUF and queue every whole packet (Core 1)
+    
+    Args:
+        write_pos: Bytes already held in RX_BUF from the previous call
+        
+    Returns:
+        int: Bytes left in RX_BUF, a partial packet moved to the front
+    """
+    available = uart2.any()
+    if not available:
+        return write_pos
+    count = uart2.readinto(RX_READ_VIEWS[write_pos], min(available, len(RX_BUF) - write_pos))
+    if not count:
+        return write_pos
+    write_pos += count
+    
+    # Validate and queue every complete packet in one viper pass,
+    # leaving parsing to Core 0
+    ring = rx_ring
+    head = _drain(RX_BUF, write_pos, ring.buf, (ring.head << 8) | ring.tail)
+    read_pos = write_pos & ~3
+    if _DEBUG:
+        dropped = (read_pos >> 2) - ((head - ring.head) & ring.mask)
+        if dropped:
+            print(f"{dropped} packet(s) dropped: bad checksum or RX ring full")
+    if head != ring.head:
+        ring.head = head
+        wake_core0()
+    
+    # Move the partial packet tail back to the front
+    for i in range(write_pos - read_pos):
+        RX_BUF[i] = RX_BUF[read_pos + i]
+    return write_pos - read_pos
+
 def core1_task():
-    global einkRunning, thread_handoff_complete
+    global einkRunning, thread_handoff_complete, core1_alive
     
-    # First, run the eink task
+    # First, run the eink task. Whatever happens, finally shuts the panel down
+    # and hands the eink back to the SoM.
     try:
         einkRunning = True
         if eink.init == False:
             eink.re_init()
         
         eink.epd_init_fast()
-            
-        try:
-            with open('./loading1.bin', 'rb') as f:
-                base_image = f.read()
-            eink.epd_set_basemap(base_image)
-            
-        except OSError:
-            print("Loading files not found")
-            einkRunning = False
         
+        # Read each animation frame from flash once, then cycle through them
+        with open('./loading1.bin', 'rb') as f:
+            image1_data = f.read()
+        with open('./loading2.bin', 'rb') as f:
+            image2_data = f.read()
+        eink.epd_set_basemap(image1_data)
+        animation_frames = (image2_data, image1_data)
+        
+        # einkRunning is a single-word flag, so read it without the lock;
+        # eink_lock only guards the writes that clear it
         repeat = 0
-        while True:
-            with eink_lock:
-                if not einkRunning or repeat >= 3:
-                    break
-            
-            try:
-                with open('./loading2.bin', 'rb') as f:
-                    image2_data = f.read()
-                eink.epd_display_part_all(image2_data)
+        while einkRunning and repeat < 3:
+            for frame in animation_frames:
+                eink.epd_display_part_all(frame)
                 utime.sleep_ms(50)  # Short delay between frames
                 
-                with open('./loading1.bin', 'rb') as f:
-                    image1_data = f.read()
-                eink.epd_display_part_all(image1_data)
-                utime.sleep_ms(50)
-            except OSError:
-                print("Animation files not found")
-                break
-                
-            wdt.feed()
             repeat += 1
         
-        eink.de_init()
-        with eink_lock:
-            einkRunning = False
-        einkMux.low()
         print("Eink Task Completed")
     except Exception as e:
+        # Includes OSError when the loading files are missing
         print(f"Exception in eink task: {e}")
+    finally:
         eink.de_init()
         with eink_lock:
             einkRunning = False
         einkMux.low()
     
+    # This function never returns, so drop the frame buffers explicitly to
+    # give their heap back for the rest of the run
+    animation_frames = image1_data = image2_data = None
+    
     # Signal that eink is done and we can transition to UART
+    core1_alive = True
     thread_handoff_complete = True
+    wake_core0()
     
     # Start UART packet reception loop (Core 1)
     print("Starting UART reception loop on Core 1")
-    uart_buffer = bytearray()
+    write_pos = 0  # Bytes held in RX_BUF; only a partial packet survives a pass
+    
+    if UART_RX_IRQ:
+        uart2.irq(handler=uart_rx_handler, trigger=machine.UART.IRQ_RXIDLE)
     
     # Send boot notification now that UART reception is ready
     send_boot_notification()
     
     while True:
+        core1_alive = True
         try:
-            wdt.feed()
+            # Read and queue everything the UART has buffered
+            write_pos = receive_uart(write_pos)
             
-            # Check for incoming UART data
-            if uart2.any():
-                with uart_lock:
-                    data = uart2.read()
-                    if data:
-                        uart_buffer.extend(data)
-                        
-                        # Process complete 4-byte packets
-                        while len(uart_buffer) >= 4:
-                            packet = bytes(uart_buffer[:4])
-                            uart_buffer = uart_buffer[4:]
-                            
-                            # Validate and process packet
-                            if protocol.validate_packet(packet)[0]:
-                                process_uart_packet(packet)
-                            else:
-                                if not PRODUCTION:
-                                    print(f"Invalid packet: {[hex(b) for b in packet]}")
-            
-            utime.sleep_ms(1)  # Small delay to prevent overwhelming the CPU
+            if UART_RX_IRQ:
+                # RXIDLE only fires once the line goes quiet, so only sleep when
+                # this pass left nothing behind (a burst can outgrow RX_BUF)
+                if not uart2.any():
+                    rx_event.acquire()  # Sleep until the RX IRQ signals new bytes
+            else:
+                utime.sleep_ms(5)  # Let several packets collect in the UART FIFO per wake
             
         except Exception as e:
             print(f"UART reception error: {e}")
@@ -405,193 +626,172 @@ def core1_task():
 _thread.start_new_thread(core1_task, ())
 print("Started core1 task")
 
-# Clean main loop
-while True:
-    wdt.feed()
+# Clean main loop. Run as a function so the objects used on every pass are
+# bound once as default arguments and read as fast locals instead of globals.
+def main_loop(uart2=uart2, uart_lock=uart_lock, np_controller=np_controller,
+              power_manager=power_manager, led_command_queue=led_command_queue,
+              drain_rx_packets=drain_rx_packets, core0_event=core0_event,
+              upBTN=upBTN, selectBTN=selectBTN,
+              ticks_ms=utime.ticks_ms, ticks_diff=utime.ticks_diff,
+              sleep_ms=utime.sleep_ms):
+    global led_queue_head, einkRunning, core0_alive
     
-    # Only proceed with normal operation after handoff is complete
-    if thread_handoff_complete:
-        # Process LED commands from queue (Core 0)
-        led_commands = get_led_commands_from_queue()
-        for command in led_commands:
-            try:
-                if command.get('type') == 'status_request':
-                    # Handle LED status request
-                    led_id = command['led_id']
-                    status_code = command.get('status_code', 0)
-                    
-                    # Get controller status
-                    controller_status = np_controller.get_status()
-                    
-                    # Send status response based on status_code
-                    if status_code == 0:  # General status
-                        status_value = 1 if controller_status['animation_running'] else 0
-                    elif status_code == 1:  # Queue length
-                        status_value = controller_status['queue_length']
-                    elif status_code == 2:  # Brightness
-                        status_value = int(controller_status['brightness'] * 255)
-                    else:  # Unknown status code
-                        status_value = 0
-                    
-                    # Send status packet
-                    with uart_lock:
-                        packet = protocol.create_led_status_packet(led_id, status_code, status_value)
-                        uart2.write(packet)
-                        if not PRODUCTION:
-                            print(f"LED status response: LED{led_id}, code{status_code}, value{status_value}")
-                
-                elif command.get('execute'):
-                    # Execute all queued LED commands
-                    np_controller.execute_queue()
-                else:
-                    # Add command to neopixel controller queue
-                    led_id = command['led_id']
-                    if led_id == 15:  # Convert protocol LED_ALL to controller format
-                        led_id = 255
-                    
-                    # Determine animation mode based on time_value and other factors
-                    time_value = command['time_value']
-                    if time_value == 0:
-                        mode = np_controller.MODE_STATIC
-                    elif time_value <= 5:
-                        mode = np_controller.MODE_BLINK
-                    elif time_value <= 10:
-                        mode = np_controller.MODE_FADE
+    while True:
+        core0_alive = True
+        # Only proceed with normal operation after handoff is complete
+        if thread_handoff_complete:
+            # Parse packets received by Core 1 and queue the resulting commands
+            drain_rx_packets()
+            
+            # Process LED commands from queue (Core 0)
+            while led_queue_head != led_queue_tail:
+                command = led_command_queue[led_queue_head]
+                led_command_queue[led_queue_head] = None
+                led_queue_head = (led_queue_head + 1) & (LED_QUEUE_SIZE - 1)
+                try:
+                    kind = command[K_KIND]
+                    if kind == _LED_KIND_EXECUTE:
+                        # Execute all queued LED commands
+                        np_controller.execute_queue()
                     else:
-                        mode = np_controller.MODE_RAINBOW
-                    
-                    np_controller.add_to_queue(
-                        led_id=led_id,
-                        mode=mode,
-                        color_data=command['color'],
-                        time_value=time_value
-                    )
-                    
-                    if not PRODUCTION:
-                        print(f"LED command added to controller queue: LED{led_id}, color{command['color']}, mode{mode}")
+                        # Add command to neopixel controller queue
+                        led_id = command[K_LED]
+                        if led_id == 15:  # Convert protocol LED_ALL to controller format
+                            led_id = 255
                         
-            except Exception as e:
-                print(f"Error processing LED command: {e}")
-                # Send error report
+                        # Determine animation mode based on time_value and other factors
+                        time_value = command[K_TIME]
+                        mode = _MODE_LUT[time_value]
+                        
+                        np_controller.add_to_queue(
+                            led_id=led_id,
+                            mode=mode,
+                            color_data=command[K_COLOR],
+                            time_value=time_value
+                        )
+                        
+                        if _DEBUG:
+                            print(f"LED command added to controller queue: LED{led_id}, color{tuple(command[K_COLOR])}, mode{mode}")
+                            
+                except Exception as e:
+                    print(f"Error processing LED command: {e}")
+                    # Send error report
+                    try:
+                        error_led_id = command[K_LED]
+                        if error_led_id == 15:  # Convert protocol LED_ALL back
+                            error_led_id = 255
+                        np_controller.send_error_report(error_led_id, 1, str(e))
+                    except:
+                        pass  # Don't let error reporting crash the system
+            
+            # Process power commands from queue (Core 0)
+            power_commands = get_power_commands_from_queue()
+            for command in power_commands:
                 try:
-                    error_led_id = command.get('led_id', 0)
-                    if error_led_id == 15:  # Convert protocol LED_ALL back
-                        error_led_id = 255
-                    np_controller.send_error_report(error_led_id, 1, str(e))
-                except:
-                    pass  # Don't let error reporting crash the system
-        
-        # Process power commands from queue (Core 0)
-        power_commands = get_power_commands_from_queue()
-        for command in power_commands:
-            try:
-                cmd_type = command.get('command', 'unknown')
-                
-                if cmd_type == 'query':
-                    # SoM → RP2040: Query power status
-                    current_state = power_manager.get_power_state()
-                    with uart_lock:
-                        packet = protocol.create_power_status_packet_rp2040_to_som(current_state, 0x00)
-                        uart2.write(packet)
-                        if not PRODUCTION:
+                    cmd_type, data0, data1 = command
+                    
+                    if cmd_type == _POWER_CMD_QUERY:
+                        # SoM → RP2040: Query power status
+                        current_state = power_manager.get_power_state()
+                        _fill_power_status_packet(_POWER_TX, current_state, 0x00)
+                        with uart_lock:
+                            uart2.write(_POWER_TX)
+                        if _DEBUG:
                             print(f"Power status response sent: state=0x{current_state:02X}")
-                
-                elif cmd_type == 'set_state':
-                    # SoM → RP2040: Set power state
-                    new_state = command.get('power_state', power_manager.current_power_state)
-                    power_manager.set_power_state(new_state)
-                    # Send acknowledgment
-                    with uart_lock:
-                        packet = protocol.create_power_status_packet_rp2040_to_som(new_state, 0x00)
-                        uart2.write(packet)
-                        if not PRODUCTION:
+                    
+                    elif cmd_type == _POWER_CMD_SET:
+                        # SoM → RP2040: Set power state
+                        new_state = data0
+                        power_manager.set_power_state(new_state)
+                        # Send acknowledgment
+                        _fill_power_status_packet(_POWER_TX, new_state, 0x00)
+                        with uart_lock:
+                            uart2.write(_POWER_TX)
+                        if _DEBUG:
                             print(f"Power state set to: 0x{new_state:02X}")
-                
-                elif cmd_type == 'sleep':
-                    # SoM → RP2040: Enter sleep mode
-                    delay_seconds = command.get('delay_seconds', 0)
-                    sleep_flags = command.get('sleep_flags', 0)
-                    power_manager.handle_sleep_command(delay_seconds, sleep_flags)
-                
-                elif cmd_type == 'shutdown':
-                    # SoM → RP2040: Prepare for shutdown
-                    shutdown_mode = command.get('shutdown_mode', 0)
-                    reason_code = command.get('reason_code', 0)
-                    power_manager.handle_shutdown_command(shutdown_mode, reason_code)
                     
-                    # Send shutdown acknowledgment
-                    with uart_lock:
-                        packet = protocol.create_power_status_packet_rp2040_to_som(
-                            protocol.POWER_STATE_OFF, shutdown_mode)
-                        uart2.write(packet)
-                        if not PRODUCTION:
-                            print(f"Shutdown ACK sent: mode={shutdown_mode}")
-                
-                elif cmd_type == 'request_metrics':
-                    # SoM → RP2040: Send all sensor metrics
-                    metrics = power_manager.get_all_metrics()
+                    elif cmd_type == _POWER_CMD_SLEEP:
+                        # SoM → RP2040: Enter sleep mode
+                        delay_seconds = data0
+                        sleep_flags = data1
+                        power_manager.handle_sleep_command(delay_seconds, sleep_flags)
                     
-                    with uart_lock:
-                        # Send current measurement
-                        current_packet = protocol.create_power_metrics_packet_rp2040_to_som(
-                            protocol.POWER_CMD_CURRENT, metrics['current_ma'])
-                        uart2.write(current_packet)
-                        uart2.flush()  # Ensure immediate transmission
+                    elif cmd_type == _POWER_CMD_SHUTDOWN:
+                        # SoM → RP2040: Prepare for shutdown
+                        shutdown_mode = data0  # 0=normal, 1=emergency, 2=reboot
+                        reason_code = data1
+                        power_manager.handle_shutdown_command(shutdown_mode, reason_code)
                         
-                        # Send battery percentage
-                        battery_packet = protocol.create_power_metrics_packet_rp2040_to_som(
-                            protocol.POWER_CMD_BATTERY, metrics['battery_percent'])
-                        uart2.write(battery_packet)
-                        uart2.flush()  # Ensure immediate transmission
+                        # Send shutdown acknowledgment
+                        _fill_power_status_packet(
+                            _POWER_TX, _POWER_STATE_OFF, shutdown_mode)
+                        with uart_lock:
+                            uart2.write(_POWER_TX)
+                        if _DEBUG:
+                            print(f"Shutdown ACK sent: mode={shutdown_mode}")
+                    
+                    elif cmd_type == _POWER_CMD_REQUEST_METRICS:
+                        # SoM → RP2040: Send all sensor metrics
+                        metrics = power_manager.get_all_metrics()
                         
-                        # Send temperature
-                        temp_packet = protocol.create_power_metrics_packet_rp2040_to_som(
-                            protocol.POWER_CMD_TEMP, metrics['temperature_0_1c'])
-                        uart2.write(temp_packet)
-                        uart2.flush()  # Ensure immediate transmission
+                        # Fill all four metric packets first, then send them as
+                        # one write so the TX FIFO is only waited on once
+                        views = _METRICS_TX_VIEWS
+                        _fill_power_metrics_packet(
+                            views[0], _POWER_CMD_CURRENT, metrics['current_ma'])
+                        _fill_power_metrics_packet(
+                            views[1], _POWER_CMD_BATTERY, metrics['battery_percent'])
+                        _fill_power_metrics_packet(
+                            views[2], _POWER_CMD_TEMP, metrics['temperature_0_1c'])
+                        _fill_power_metrics_packet(
+                            views[3], _POWER_CMD_VOLTAGE, metrics['voltage_mv'])
                         
-                        # Send voltage
-                        voltage_packet = protocol.create_power_metrics_packet_rp2040_to_som(
-                            protocol.POWER_CMD_VOLTAGE, metrics['voltage_mv'])
-                        uart2.write(voltage_packet)
-                        uart2.flush()  # Ensure immediate transmission
+                        with uart_lock:
+                            uart2.write(_METRICS_TX)
+                            uart2.flush()  # Ensure immediate transmission
                         
-                        if not PRODUCTION:
+                        if _DEBUG:
                             print(f"Metrics sent: {metrics}")
-                
-                else:
-                    if not PRODUCTION:
-                        print(f"Unknown power command: {cmd_type}")
-                        
-            except Exception as e:
-                print(f"Error processing power command: {e}")
+                    
+                    else:
+                        if _DEBUG:
+                            print(f"Unknown power command: {cmd_type}")
+                            
+                except Exception as e:
+                    print(f"Error processing power command: {e}")
+            
+            # Special button combination handling (UP + SELECT for 10 seconds = USB switch)
+            if upBTN.value() == 1 and selectBTN.value() == 1:
+                # Ignore button edges during the hold so bounces don't schedule
+                # button packets in between the shutdown packets
+                detach_button_irqs()
+                try:
+                    start_time = ticks_ms()
+                    elapsed = 0
+                    while elapsed < _BTN_HOLD_USBSWITCH_MS:
+                        core0_alive = True
+                        if upBTN.value() == 0 or selectBTN.value() == 0:
+                            break
+                        if elapsed >= _BTN_HOLD_SHUTDOWN_MS:
+                            # Send shutdown packet using new protocol
+                            with uart_lock:
+                                uart2.write(_SHUTDOWN_PKT)
+                        sleep_ms(_BTN_HOLD_POLL_MS)
+                        elapsed = ticks_diff(ticks_ms(), start_time)
+                    if elapsed >= _BTN_HOLD_USBSWITCH_MS:
+                        einkStatus.low()  
+                        einkMux.low() # SOM CONTROL E-INK
+                        uart2.write("xSAM_USB\n")
+                        if _PRODUCTION:
+                            switch_usb(SAM_USB)
+                        with eink_lock:
+                            einkRunning = False
+                finally:
+                    attach_button_irqs()
+                    send_button_state()  # Resync the SoM with edges missed while detached
         
-        # Special button combination handling (UP + SELECT for 10 seconds = USB switch)
-        if debounce(upBTN) and selectBTN.value() == 1:
-            start_time = utime.ticks_ms()
-            while utime.ticks_diff(utime.ticks_ms(), start_time) < 10000:
-                if upBTN.value() == 0 or selectBTN.value() == 0:
-                    break
-                if utime.ticks_diff(utime.ticks_ms(), start_time) >= 2000:
-                    # Send shutdown packet using new protocol
-                    with uart_lock:
-                        packet = protocol.create_power_status_packet_rp2040_to_som(
-                            protocol.POWER_STATE_OFF, 0x00)
-                        uart2.write(packet)
-                wdt.feed()
-                utime.sleep_ms(10)
-            if utime.ticks_diff(utime.ticks_ms(), start_time) >= 10000:
-                einkStatus.low()  
-                einkMux.low() # SOM CONTROL E-INK
-                uart2.write("xSAM_USB\n")
-                if PRODUCTION:
-                    switch_usb("SAM_USB")
-                einkRunning = False
-    
-    utime.sleep_ms(1)
-
-
-
-
-
+        # Go round again at once if work was signalled during this pass
+        if not core0_event.acquire(0):
+            sleep_ms(_IDLE_MS)
 
+main_loop()
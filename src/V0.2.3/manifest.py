@@ -0,0 +1,21 @@
+#Author: PamirAI
+#Date: 2025-07-14
+#Version: 0.2.3
+#Description: Freeze manifest for building the SAM firmware into a custom RP2040 MicroPython image
+#
+# Frozen modules run as precompiled bytecode straight from flash, skipping the
+# parse/compile step at boot, and their @micropython.native/viper functions are
+# compiled to machine code at build time. A frozen main.py is run at boot like
+# one on the filesystem; the loading*.bin frames stay on the filesystem. The
+# rp2 port already builds with MICROPY_OPT_COMPUTED_GOTO enabled. Build from
+# the MicroPython source tree with:
+#   make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/src/V0.2.3/manifest.py
+
+include("$(PORT_DIR)/boards/manifest.py")
+
+module("main.py")
+module("pamir_uart_protocols.py")
+module("neopixel_controller.py")
+module("power_manager.py")
+module("battery.py")
+module("eink_driver_sam.py")
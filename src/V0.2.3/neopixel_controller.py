@@ -8,6 +8,70 @@ import neopixel
 import utime
 import _thread
 import math
+import micropython
+from micropython import const
+
+_FADE_STEPS = const(20)
+
+# Animation queue: a ring of preallocated rows, one bytearray per command
+# laid out as [led_id, mode, r, g, b, time_value]. Size must be a power of two.
+_QUEUE_SIZE = const(32)
+_Q_LED = const(0)
+_Q_MODE = const(1)
+_Q_COLOR = const(2)  # r, g, b at offsets 2-4
+_Q_TIME = const(5)
+_Q_ROW = const(6)
+
+# Which of (c, x, 0) each of r, g, b takes in every 60 degree hue sector,
+# as the byte shift that picks it out of c | (x << 8)
+_HSV_SECTOR_SHIFTS = bytes((
+    0, 8, 16,   # 0-59:    (c, x, 0)
+    8, 0, 16,   # 60-119:  (x, c, 0)
+    16, 0, 8,   # 120-179: (0, c, x)
+    16, 8, 0,   # 180-239: (0, x, c)
+    8, 16, 0,   # 240-299: (x, 0, c)
+    0, 16, 8,   # 300-359: (c, 0, x)
+))
+
+@micropython.viper
+def _hsv_to_rgb_v(h: int, s: int, v: int) -> int:
+    """Integer HSV to RGB conversion
+    
+    Args:
+        h: Hue in degrees (0-359)
+        s: Saturation (0-255)
+        v: Value (0-255)
+        
+    Returns:
+        int: Packed 0xRRGGBB color
+    """
+    c = (v * s) // 255
+    d = h % 120 - 60
+    if d < 0:
+        d = -d
+    x = (c * (60 - d)) // 60
+    m = v - c
+    
+    # Table lookup on the hue sector instead of a 6-way branch
+    shifts = ptr8(_HSV_SECTOR_SHIFTS)
+    sector = (h // 60) * 3
+    cx = c | (x << 8)
+    r = ((cx >> int(shifts[sector])) & 0xFF) + m
+    g = ((cx >> int(shifts[sector + 1])) & 0xFF) + m
+    b = ((cx >> int(shifts[sector + 2])) & 0xFF) + m
+    
+    return (r << 16) | (g << 8) | b
+
+@micropython.viper
+def _fill_pixels(buf: ptr8, nbytes: int, pixel: ptr8, bpp: int):
+    """Repeat the bpp-byte pixel across the first nbytes of buf"""
+    i = 0
+    while i < nbytes:
+        j = 0
+        while j < bpp:
+            buf[i + j] = pixel[j]
+            j += 1
+        i += bpp
 
 class NeoPixelController:
     
@@ -18,18 +82,50 @@ class NeoPixelController:
     MODE_RAINBOW = 3
     MODE_SEQUENCE = 4
     
+    # 4-bit to 8-bit channel scaling (x * 17, so 0x0 -> 0x00 and 0xF -> 0xFF)
+    _N4_TO_N8 = bytes(i * 17 for i in range(16))
+    
+    # Full-saturation rainbow, 3 bytes (r, g, b) per degree of hue. Built on
+    # first use and shared by all instances.
+    _RAINBOW = None
+    
     def __init__(self, pin=20, num_leds=1, default_brightness=0.5, completion_callback=None):
         self.pin = pin
         self.num_leds = num_leds
         self.np = neopixel.NeoPixel(machine.Pin(pin), num_leds)
-        self.np.brightness = min(max(default_brightness, 0.0), 1.0)
+        # Channel value (0-255) to brightness-scaled value, refilled whenever
+        # brightness changes
+        self._scale_lut = bytearray(256)
+        self.brightness = default_brightness
         
-        # Thread safety
+        # Raw pixel buffer, written directly for whole-strip fills. Each pixel
+        # is bpp bytes with channel i at offset ORDER[i] (GRB on WS2812).
+        self._buf = self.np.buf
+        self._zero = bytes(len(self._buf))
+        self._pixel = bytearray(self.np.bpp)
+        self._order = self.np.ORDER
+        # Per-level fade colors, refilled at the start of each fade
+        self._fade_levels = bytearray((_FADE_STEPS + 1) * 3)
+        
+        # Thread safety. The lock guards set_color()/clear_all() from outside
+        # the animation thread; the animation queue is single-producer
+        # (add_to_queue owns queue_tail) single-consumer (the animation thread
+        # owns queue_head), so it needs no lock.
         self.lock = _thread.allocate_lock()
         
         # Animation state
         self.animation_running = False
-        self.animation_queue = []
+        self.animation_queue = [bytearray(_Q_ROW) for _ in range(_QUEUE_SIZE)]
+        # Per-row view of the r, g, b bytes, handed to the animations as color
+        self._queue_colors = [memoryview(row)[_Q_COLOR:_Q_COLOR + 3] for row in self.animation_queue]
+        self.queue_head = 0
+        self.queue_tail = 0
+        
+        # Animation handlers indexed by mode (MODE_STATIC..MODE_SEQUENCE), all
+        # taking (led_id, color, delay_ms). Bound once so dispatch is one lookup.
+        self._animations = (self._animate_static, self._animate_blink,
+                            self._animate_fade, self._animate_rainbow,
+                            self._animate_sequence)
         self.current_thread = None
         
         # Completion callback for LED acknowledgments
@@ -37,14 +133,38 @@ class NeoPixelController:
         self.last_executed_led_id = 0
         self.last_sequence_length = 0
         
+        # Build the rainbow palette once per boot
+        if NeoPixelController._RAINBOW is None:
+            palette = bytearray(360 * 3)
+            for hue in range(360):
+                rgb = _hsv_to_rgb_v(hue, 255, 255)
+                palette[hue * 3] = (rgb >> 16) & 0xFF
+                palette[hue * 3 + 1] = (rgb >> 8) & 0xFF
+                palette[hue * 3 + 2] = rgb & 0xFF
+            NeoPixelController._RAINBOW = bytes(palette)
+        
         # Clear all LEDs on init
         self.clear_all()
     
+    @property
+    def brightness(self):
+        """Global brightness (0.0-1.0)"""
+        return self._brightness
+    
+    @brightness.setter
+    def brightness(self, value):
+        self._brightness = min(max(value, 0.0), 1.0)
+        # Also kept as Q8 fixed point (256 = full), so scaling stays integer
+        br = int(self._brightness * 256)
+        self._brightness_q8 = br
+        lut = self._scale_lut
+        for v in range(256):
+            lut[v] = (v * br) >> 8
+    
     def clear_all(self):
         """Turn off all LEDs"""
         with self.lock:
-            for i in range(self.num_leds):
-                self.np[i] = (0, 0, 0)
+            self._buf[:] = self._zero
             self.np.write()
     
     def set_color(self, color, brightness=None, index=None):
@@ -57,21 +177,51 @@ class NeoPixelController:
         """
         with self.lock:
             if brightness is not None:
-                self.np.brightness = min(max(brightness, 0.0), 1.0)
+                self.brightness = brightness
             
-            r = int(color[0] * self.np.brightness)
-            g = int(color[1] * self.np.brightness)
-            b = int(color[2] * self.np.brightness)
+            lut = self._scale_lut
+            r = lut[color[0]]
+            g = lut[color[1]]
+            b = lut[color[2]]
             
             if index is None:
-                for i in range(len(self.np)):
-                    self.np[i] = (r, g, b)
+                # Lay out one pixel, then repeat it over the whole strip
+                pixel = self._pixel
+                order = self._order
+                pixel[order[0]] = r
+                pixel[order[1]] = g
+                pixel[order[2]] = b
+                _fill_pixels(self._buf, len(self._buf), pixel, len(pixel))
             else:
                 if 0 <= index < len(self.np):
                     self.np[index] = (r, g, b)
             
             self.np.write()
     
+    def _set_pixel_fast(self, index, r, g, b):
+        """Write already-scaled channels straight into the pixel buffer
+        
+        Skips the lock and brightness scaling in set_color(); only for the
+        animation thread, which is the sole writer while animation_running.
+        Animations scale by brightness once up front and then call this
+        on every step.
+        
+        Args:
+            index: LED index (None for all LEDs)
+            r, g, b: Channel values (0-255), brightness already applied
+        """
+        pixel = self._pixel
+        order = self._order
+        pixel[order[0]] = r
+        pixel[order[1]] = g
+        pixel[order[2]] = b
+        if index is None:
+            _fill_pixels(self._buf, len(self._buf), pixel, len(pixel))
+        elif 0 <= index < self.num_leds:
+            off = index * len(pixel)
+            self._buf[off:off + len(pixel)] = pixel
+        self.np.write()
+    
     def rgb444_to_rgb888(self, rgb444_data):
         """Convert RGB444 (4 bits per channel) to RGB888 (8 bits per channel)
         
@@ -82,11 +232,9 @@ class NeoPixelController:
             (r8, g8, b8) tuple with 8-bit values (0-255)
         """
         r4, g4, b4 = rgb444_data
-        # Scale 4-bit to 8-bit: multiply by 17 (255/15)
-        r8 = (r4 & 0x0F) * 17
-        g8 = (g4 & 0x0F) * 17
-        b8 = (b4 & 0x0F) * 17
-        return (r8, g8, b8)
+        # Scale 4-bit to 8-bit by table lookup (multiply by 17 = 255/15)
+        lut = self._N4_TO_N8
+        return (lut[r4 & 0x0F], lut[g4 & 0x0F], lut[b4 & 0x0F])
     
     def stop_animation(self):
         """Stop current animation"""
@@ -100,19 +248,29 @@ class NeoPixelController:
             mode: Animation mode (MODE_STATIC, MODE_BLINK, etc.)
             color_data: (r4, g4, b4) tuple (4-bit values)
             time_value: Timing parameter (0-15)
+            
+        Raises:
+            ValueError: If the queue is full
         """
-        command = {
-            'led_id': led_id,
-            'mode': mode,
-            'color': self.rgb444_to_rgb888(color_data),
-            'time_value': time_value,
-            'delay_ms': (time_value + 1) * 100  # Convert to milliseconds
-        }
-        self.animation_queue.append(command)
+        tail = self.queue_tail
+        next_tail = (tail + 1) & (_QUEUE_SIZE - 1)
+        if next_tail == self.queue_head:
+            raise ValueError("LED animation queue full")
+        
+        # Fill the preallocated row in place, no per-command allocation
+        row = self.animation_queue[tail]
+        lut = self._N4_TO_N8
+        row[_Q_LED] = led_id
+        row[_Q_MODE] = mode
+        row[_Q_COLOR] = lut[color_data[0] & 0x0F]
+        row[_Q_COLOR + 1] = lut[color_data[1] & 0x0F]
+        row[_Q_COLOR + 2] = lut[color_data[2] & 0x0F]
+        row[_Q_TIME] = time_value
+        self.queue_tail = next_tail
     
     def execute_queue(self):
         """Execute all queued LED commands in sequence"""
-        if not self.animation_queue:
+        if self.queue_head == self.queue_tail:
             return
         
         # Stop any current animation
@@ -126,32 +284,35 @@ class NeoPixelController:
         self.animation_running = True
         executed_commands = 0
         last_led_id = 0
+        animations = self._animations
+        # Commands are spaced 10 ms apart against a running deadline, so time
+        # already spent animating counts towards the gap
+        deadline = utime.ticks_ms()
         
         try:
-            for command in self.animation_queue:
+            while self.queue_head != self.queue_tail:
                 if not self.animation_running:
                     break
                 
-                led_id = command['led_id']
-                mode = command['mode']
-                color = command['color']
-                delay_ms = command['delay_ms']
+                head = self.queue_head
+                command = self.animation_queue[head]
+                led_id = command[_Q_LED]
+                mode = command[_Q_MODE]
+                color = self._queue_colors[head]
+                delay_ms = (command[_Q_TIME] + 1) * 100  # Convert to milliseconds
                 last_led_id = led_id
                 
-                if mode == self.MODE_STATIC:
-                    self._animate_static(led_id, color)
-                elif mode == self.MODE_BLINK:
-                    self._animate_blink(led_id, color, delay_ms)
-                elif mode == self.MODE_FADE:
-                    self._animate_fade(led_id, color, delay_ms)
-                elif mode == self.MODE_RAINBOW:
-                    self._animate_rainbow(led_id, delay_ms)
-                elif mode == self.MODE_SEQUENCE:
-                    self._animate_sequence(led_id, color, delay_ms)
+                if mode < len(animations):
+                    animations[mode](led_id, color, delay_ms)
                 
+                # Free the row only once it has been played
+                self.queue_head = (head + 1) & (_QUEUE_SIZE - 1)
                 executed_commands += 1
                 # Small delay between commands
-                utime.sleep_ms(10)
+                deadline = utime.ticks_add(deadline, 10)
+                remaining = utime.ticks_diff(deadline, utime.ticks_ms())
+                if remaining > 0:
+                    utime.sleep_ms(remaining)
                 
         except Exception as e:
             print(f"Animation error: {e}")
@@ -169,83 +330,97 @@ class NeoPixelController:
                 except Exception as e:
                     print(f"Completion callback error: {e}")
             
-            self.animation_queue.clear()
+            self.queue_head = self.queue_tail
     
-    def _animate_static(self, led_id, color):
+    def _animate_static(self, led_id, color, delay_ms=0):
         """Set static color"""
-        if led_id == 255:  # All LEDs
-            self.set_color(color)
-        else:
-            self.set_color(color, index=led_id)
+        lut = self._scale_lut
+        self._set_pixel_fast(None if led_id == 255 else led_id,  # 255 = all LEDs
+                             lut[color[0]], lut[color[1]], lut[color[2]])
     
     def _animate_blink(self, led_id, color, delay_ms):
         """Blink animation"""
+        index = None if led_id == 255 else led_id
+        lut = self._scale_lut
+        r = lut[color[0]]
+        g = lut[color[1]]
+        b = lut[color[2]]
+        
         for _ in range(5):  # Blink 5 times
             if not self.animation_running:
                 break
             
             # Turn on
-            if led_id == 255:
-                self.set_color(color)
-            else:
-                self.set_color(color, index=led_id)
+            self._set_pixel_fast(index, r, g, b)
             utime.sleep_ms(delay_ms // 2)
             
             # Turn off
-            if led_id == 255:
-                self.set_color([0, 0, 0])
-            else:
-                self.set_color([0, 0, 0], index=led_id)
+            self._set_pixel_fast(index, 0, 0, 0)
             utime.sleep_ms(delay_ms // 2)
     
+    @micropython.native
     def _animate_fade(self, led_id, color, delay_ms):
         """Fade in/out animation"""
-        steps = 20
+        steps = _FADE_STEPS
         step_delay = delay_ms // (steps * 2)
+        index = None if led_id == 255 else led_id
+        
+        # Too short to show any steps: go straight to where the fade ends
+        if step_delay == 0:
+            self._set_pixel_fast(index, 0, 0, 0)
+            return
         
-        # Fade in
+        # Brightness is fixed for the whole fade, so work out every level's
+        # color once up front; fading in and back out both read this table
+        br = self._brightness_q8
+        scale = steps * 256
+        r0 = color[0] * br
+        g0 = color[1] * br
+        b0 = color[2] * br
+        levels = self._fade_levels
         for i in range(steps + 1):
-            if not self.animation_running:
-                break
-            brightness = i / steps
-            faded_color = [int(c * brightness) for c in color]
-            
-            if led_id == 255:
-                self.set_color(faded_color)
-            else:
-                self.set_color(faded_color, index=led_id)
-            utime.sleep_ms(step_delay)
+            levels[i * 3] = (r0 * i) // scale
+            levels[i * 3 + 1] = (g0 * i) // scale
+            levels[i * 3 + 2] = (b0 * i) // scale
         
-        # Fade out
-        for i in range(steps, -1, -1):
+        # Fade in (level 0 to steps), then out (steps back to 0). Steps are
+        # paced against a deadline so the write time comes out of the delay.
+        deadline = utime.ticks_ms()
+        for step in range(2 * steps + 2):
             if not self.animation_running:
                 break
-            brightness = i / steps
-            faded_color = [int(c * brightness) for c in color]
-            
-            if led_id == 255:
-                self.set_color(faded_color)
-            else:
-                self.set_color(faded_color, index=led_id)
-            utime.sleep_ms(step_delay)
+            i = step if step <= steps else 2 * steps + 1 - step
+            base = i * 3
+            self._set_pixel_fast(index, levels[base], levels[base + 1], levels[base + 2])
+            deadline = utime.ticks_add(deadline, step_delay)
+            remaining = utime.ticks_diff(deadline, utime.ticks_ms())
+            if remaining > 0:
+                utime.sleep_ms(remaining)
     
-    def _animate_rainbow(self, led_id, delay_ms):
+    @micropython.native
+    def _animate_rainbow(self, led_id, color, delay_ms):
         """Rainbow color cycle animation"""
         steps = 360
         step_delay = max(1, delay_ms // steps)
+        # With under 1 ms per hue, skip hues rather than overrun delay_ms
+        stride = max(1, steps // max(1, delay_ms))
+        index = None if led_id == 255 else led_id
+        palette = self._RAINBOW
+        lut = self._scale_lut
         
-        for hue in range(steps):
+        deadline = utime.ticks_ms()
+        for hue in range(0, steps, stride):
             if not self.animation_running:
                 break
             
-            # Convert HSV to RGB
-            rgb = self._hsv_to_rgb(hue, 255, 255)
-            
-            if led_id == 255:
-                self.set_color(rgb)
-            else:
-                self.set_color(rgb, index=led_id)
-            utime.sleep_ms(step_delay)
+            # Look the hue up in the precomputed palette
+            base = hue * 3
+            self._set_pixel_fast(index, lut[palette[base]],
+                                 lut[palette[base + 1]], lut[palette[base + 2]])
+            deadline = utime.ticks_add(deadline, step_delay)
+            remaining = utime.ticks_diff(deadline, utime.ticks_ms())
+            if remaining > 0:
+                utime.sleep_ms(remaining)
     
     def _animate_sequence(self, led_id, color, delay_ms):
         """Custom sequence animation (placeholder)"""
@@ -255,32 +430,8 @@ class NeoPixelController:
     
     def _hsv_to_rgb(self, h, s, v):
         """Convert HSV to RGB color space"""
-        h = h % 360
-        s = s / 255.0
-        v = v / 255.0
-        
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-        
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-        
-        r = int((r + m) * 255)
-        g = int((g + m) * 255)
-        b = int((b + m) * 255)
-        
-        return [r, g, b]
+        rgb = _hsv_to_rgb_v(h % 360, s, v)
+        return [(rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF]
     
     def handle_legacy_sequence(self, data):
         """Handle legacy JSON sequence format for backward compatibility
@@ -296,7 +447,7 @@ class NeoPixelController:
         self.stop_animation()
         
         # Clear queue and add legacy sequence
-        self.animation_queue.clear()
+        self.queue_head = self.queue_tail
         colors = data.get('colors', {})
         
         # Sort sequence numbers and add to queue
@@ -328,10 +479,10 @@ class NeoPixelController:
         """
         return {
             'animation_running': self.animation_running,
-            'queue_length': len(self.animation_queue),
+            'queue_length': (self.queue_tail - self.queue_head) & (_QUEUE_SIZE - 1),
             'last_executed_led_id': self.last_executed_led_id,
             'last_sequence_length': self.last_sequence_length,
-            'brightness': self.np.brightness,
+            'brightness': self._brightness,
             'num_leds': self.num_leds
         }
     
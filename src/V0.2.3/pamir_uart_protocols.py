@@ -3,87 +3,281 @@
 #Version: 0.2.3
 #Description: Pamir SAM UART Protocol implementation for RP2040
 
-import struct
+import micropython
+from micropython import const
+
+# Protocol constants. const() lets the compiler inline them in the methods
+# below; the class re-exports each one under its public name.
+
+# RP2040 Firmware version constants for protocol negotiation
+_FIRMWARE_VERSION_MAJOR = const(1)
+_FIRMWARE_VERSION_MINOR = const(0)
+_FIRMWARE_VERSION_PATCH = const(0)
+
+# Message type constants (3 MSB of type_flags)
+_TYPE_BUTTON = const(0x00)                # 0b000xxxxx - Button state change events
+_TYPE_LED = const(0x20)                   # 0b001xxxxx - LED control commands and status
+_TYPE_POWER = const(0x40)                 # 0b010xxxxx - Power management and metrics
+_TYPE_DISPLAY = const(0x60)               # 0b011xxxxx - E-ink display control and status
+_TYPE_DEBUG_CODE = const(0x80)            # 0b100xxxxx - Numeric debug codes
+_TYPE_DEBUG_TEXT = const(0xA0)            # 0b101xxxxx - Text debug messages
+_TYPE_SYSTEM = const(0xC0)                # 0b110xxxxx - Core system control commands
+_TYPE_EXTENDED = const(0xE0)              # 0b111xxxxx - Extended commands
+
+# Button bit masks
+_BTN_UP = const(0x01)                     # Bit 0
+_BTN_DOWN = const(0x02)                   # Bit 1
+_BTN_SELECT = const(0x04)                 # Bit 2
+_BTN_POWER = const(0x08)                  # Bit 3
+
+# LED command flags (5 LSB of type_flags)
+_LED_CMD_QUEUE = const(0x00)              # Queue instruction (E=0)
+_LED_CMD_EXECUTE = const(0x10)            # Execute sequence (E=1)
+
+# LED modes/commands
+_LED_MODE_STATIC = const(0x00)            # Static color
+_LED_MODE_BLINK = const(0x04)             # Blinking
+_LED_MODE_FADE = const(0x08)              # Fade in/out
+_LED_MODE_RAINBOW = const(0x0C)           # Rainbow cycle
+_LED_MODE_SEQUENCE = const(0x10)          # Custom sequence
+
+# Special LED IDs
+_LED_ALL = const(0x0F)                    # Broadcast to all LEDs (ID 15)
+
+# LED command record fields (see new_led_command)
+_K_KIND = const(0)                        # LED_KIND_* below
+_K_LED = const(1)                         # LED index (0-15)
+_K_COLOR = const(2)                       # bytearray of 4-bit (r, g, b)
+_K_TIME = const(3)                        # Timing parameter (0-15)
+_K_STATUS = const(4)                      # Status code, for LED_KIND_STATUS records
+
+# LED command record kinds
+_LED_KIND_QUEUE = const(0)                # Queue an LED command
+_LED_KIND_STATUS = const(1)               # LED status request
+_LED_KIND_EXECUTE = const(2)              # Execute the queued sequence
+
+# Power command constants
+_POWER_CMD_QUERY = const(0x00)            # Query current power status
+_POWER_CMD_SET = const(0x10)              # Set power state
+_POWER_CMD_SLEEP = const(0x20)            # Enter sleep mode
+_POWER_CMD_SHUTDOWN = const(0x30)         # Shutdown system
+_POWER_CMD_CURRENT = const(0x40)          # Current draw reporting
+_POWER_CMD_BATTERY = const(0x50)          # Battery state reporting
+_POWER_CMD_TEMP = const(0x60)             # Temperature reporting
+_POWER_CMD_VOLTAGE = const(0x70)          # Voltage reporting
+_POWER_CMD_REQUEST_METRICS = const(0x80)  # Request all metrics
+
+# Power states
+_POWER_STATE_OFF = const(0x00)            # System off
+_POWER_STATE_RUNNING = const(0x01)        # System running
+_POWER_STATE_SUSPEND = const(0x02)        # System suspended
+_POWER_STATE_SLEEP = const(0x03)          # Low power sleep
+
+# System command constants (5 LSB of type_flags)
+_SYSTEM_CMD_PING = const(0x00)            # Ping
+_SYSTEM_CMD_PONG = const(0x01)            # Pong response
+_SYSTEM_CMD_VERSION = const(0x02)         # Firmware version request
+_SYSTEM_CMD_RESET = const(0x03)           # Reset
+
+# Shared results for rejected packets, so failure paths allocate no tuple
+_FAIL = (False, None)
+_INVALID = (None, None)
+
+# (up, down, select, power) for each 4-bit pressed mask
+_BUTTON_STATES = tuple((bool(mask & _BTN_UP), bool(mask & _BTN_DOWN),
+                        bool(mask & _BTN_SELECT), bool(mask & _BTN_POWER))
+                       for mask in range(16))
+
+# Button packet for each 4-bit pressed mask. TYPE_BUTTON is 0 and the data
+# bytes are reserved zeros, so type_flags and the checksum are both the mask.
+_BUTTON_PACKETS = tuple(bytes((_TYPE_BUTTON | mask, 0x00, 0x00, _TYPE_BUTTON | mask))
+                        for mask in range(16))
+
+# Fixed system packets, built once at import (bytes are immutable, so one
+# object can be handed to every sender)
+_PING_PACKET = bytes((_TYPE_SYSTEM | _SYSTEM_CMD_PING, 0x00, 0x00,
+                      _TYPE_SYSTEM | _SYSTEM_CMD_PING))
+# The pong reply goes out on the ping command with data[0] = 1, not on
+# SYSTEM_CMD_PONG; the SoM side expects exactly these bytes
+_PONG_PACKET = bytes((_TYPE_SYSTEM | _SYSTEM_CMD_PING, 0x01, 0x00,
+                      (_TYPE_SYSTEM | _SYSTEM_CMD_PING) ^ 0x01))
+# data[0] = MAJOR (8 bits), data[1] = MINOR (4 bits) | PATCH (4 bits)
+_VERSION_DATA0 = _FIRMWARE_VERSION_MAJOR & 0xFF
+_VERSION_DATA1 = ((_FIRMWARE_VERSION_MINOR & 0x0F) << 4) | (_FIRMWARE_VERSION_PATCH & 0x0F)
+_VERSION_PACKET = bytes((_TYPE_SYSTEM | _SYSTEM_CMD_VERSION, _VERSION_DATA0, _VERSION_DATA1,
+                         (_TYPE_SYSTEM | _SYSTEM_CMD_VERSION) ^ _VERSION_DATA0 ^ _VERSION_DATA1))
+
+@micropython.viper
+def validate4(buf: ptr8, off: int) -> int:
+    """Check the XOR checksum of the 4-byte packet at buf[off]
+    
+    Args:
+        buf: Buffer holding the packet (bytes, bytearray or memoryview)
+        off: Offset of the packet's type_flags byte
+        
+    Returns:
+        int: 1 if the checksum matches, 0 otherwise
+    """
+    if (int(buf[off]) ^ int(buf[off + 1]) ^ int(buf[off + 2])) == int(buf[off + 3]):
+        return 1
+    return 0
+
+@micropython.viper
+def pack4(buf: ptr8, type_flags: int, data0: int, data1: int):
+    """Write a 4-byte packet with its XOR checksum into buf[0:4]
+    
+    Args:
+        buf: Writable buffer of at least 4 bytes (bytearray or memoryview)
+        type_flags, data0, data1: Packet bytes (0-255)
+    """
+    buf[0] = type_flags
+    buf[1] = data0
+    buf[2] = data1
+    buf[3] = type_flags ^ data0 ^ data1
+
+def _create_packet(type_flags, data0=0x00, data1=0x00):
+    """Create a 4-byte protocol packet with checksum"""
+    # Checksum inlined (see calculate_checksum) to skip a method call per packet
+    checksum = type_flags ^ data0 ^ data1
+    return bytes((type_flags, data0, data1, checksum))
+
+def _validate_packet(packet_bytes):
+    """Validate packet checksum and return parsed data"""
+    if len(packet_bytes) != 4:
+        return _FAIL
+    
+    # Reject bad checksums before unpacking anything
+    if not validate4(packet_bytes, 0):
+        return _FAIL
+    
+    return True, (packet_bytes[0], packet_bytes[1], packet_bytes[2], packet_bytes[3])
+
+def _validate_packet_fast(buf, offset=0):
+    """Validate the packet at buf[offset] without checking its length
+    
+    For receive paths that already guarantee 4 bytes at offset, e.g. a
+    slot of a preallocated ring buffer; no slice is taken.
+    
+    Args:
+        buf: Buffer holding at least offset + 4 bytes
+        offset: Offset of the packet's type_flags byte
+        
+    Returns:
+        tuple: (valid, (type_flags, data0, data1, checksum)), as validate_packet
+    """
+    if not validate4(buf, offset):
+        return _FAIL
+    
+    return True, (buf[offset], buf[offset + 1], buf[offset + 2], buf[offset + 3])
 
 class PamirUartProtocols:
     
     # RP2040 Firmware version constants for protocol negotiation
-    FIRMWARE_VERSION_MAJOR = 1
-    FIRMWARE_VERSION_MINOR = 0
-    FIRMWARE_VERSION_PATCH = 0
+    FIRMWARE_VERSION_MAJOR = _FIRMWARE_VERSION_MAJOR
+    FIRMWARE_VERSION_MINOR = _FIRMWARE_VERSION_MINOR
+    FIRMWARE_VERSION_PATCH = _FIRMWARE_VERSION_PATCH
     
     # Message type constants (3 MSB of type_flags)
-    TYPE_BUTTON = 0x00      # 0b000xxxxx - Button state change events
-    TYPE_LED = 0x20         # 0b001xxxxx - LED control commands and status
-    TYPE_POWER = 0x40       # 0b010xxxxx - Power management and metrics
-    TYPE_DISPLAY = 0x60     # 0b011xxxxx - E-ink display control and status
-    TYPE_DEBUG_CODE = 0x80  # 0b100xxxxx - Numeric debug codes
-    TYPE_DEBUG_TEXT = 0xA0  # 0b101xxxxx - Text debug messages
-    TYPE_SYSTEM = 0xC0      # 0b110xxxxx - Core system control commands
-    TYPE_EXTENDED = 0xE0    # 0b111xxxxx - Extended commands
+    TYPE_BUTTON = _TYPE_BUTTON
+    TYPE_LED = _TYPE_LED
+    TYPE_POWER = _TYPE_POWER
+    TYPE_DISPLAY = _TYPE_DISPLAY
+    TYPE_DEBUG_CODE = _TYPE_DEBUG_CODE
+    TYPE_DEBUG_TEXT = _TYPE_DEBUG_TEXT
+    TYPE_SYSTEM = _TYPE_SYSTEM
+    TYPE_EXTENDED = _TYPE_EXTENDED
     
     # Button bit masks
-    BTN_UP = 0x01       # Bit 0
-    BTN_DOWN = 0x02     # Bit 1
-    BTN_SELECT = 0x04   # Bit 2
-    BTN_POWER = 0x08    # Bit 3
+    BTN_UP = _BTN_UP
+    BTN_DOWN = _BTN_DOWN
+    BTN_SELECT = _BTN_SELECT
+    BTN_POWER = _BTN_POWER
+    
+    # Prebuilt button packets, indexed by the BTN_* pressed mask
+    BUTTON_PACKETS = _BUTTON_PACKETS
     
     # LED command flags (5 LSB of type_flags)
-    LED_CMD_QUEUE = 0x00    # Queue instruction (E=0)
-    LED_CMD_EXECUTE = 0x10  # Execute sequence (E=1)
+    LED_CMD_QUEUE = _LED_CMD_QUEUE
+    LED_CMD_EXECUTE = _LED_CMD_EXECUTE
     
     # LED modes/commands
-    LED_MODE_STATIC = 0x00   # Static color
-    LED_MODE_BLINK = 0x04    # Blinking
-    LED_MODE_FADE = 0x08     # Fade in/out
-    LED_MODE_RAINBOW = 0x0C  # Rainbow cycle
-    LED_MODE_SEQUENCE = 0x10 # Custom sequence
+    LED_MODE_STATIC = _LED_MODE_STATIC
+    LED_MODE_BLINK = _LED_MODE_BLINK
+    LED_MODE_FADE = _LED_MODE_FADE
+    LED_MODE_RAINBOW = _LED_MODE_RAINBOW
+    LED_MODE_SEQUENCE = _LED_MODE_SEQUENCE
     
     # Special LED IDs
-    LED_ALL = 0x0F          # Broadcast to all LEDs (ID 15)
+    LED_ALL = _LED_ALL
+    
+    # LED command record fields (see new_led_command)
+    K_KIND = _K_KIND
+    K_LED = _K_LED
+    K_COLOR = _K_COLOR
+    K_TIME = _K_TIME
+    K_STATUS = _K_STATUS
+    
+    # LED command record kinds
+    LED_KIND_QUEUE = _LED_KIND_QUEUE
+    LED_KIND_STATUS = _LED_KIND_STATUS
+    LED_KIND_EXECUTE = _LED_KIND_EXECUTE
     
     # Power command constants
-    POWER_CMD_QUERY = 0x00          # Query current power status
-    POWER_CMD_SET = 0x10            # Set power state  
-    POWER_CMD_SLEEP = 0x20          # Enter sleep mode
-    POWER_CMD_SHUTDOWN = 0x30       # Shutdown system
-    POWER_CMD_CURRENT = 0x40        # Current draw reporting
-    POWER_CMD_BATTERY = 0x50        # Battery state reporting
-    POWER_CMD_TEMP = 0x60           # Temperature reporting
-    POWER_CMD_VOLTAGE = 0x70        # Voltage reporting
-    POWER_CMD_REQUEST_METRICS = 0x80 # Request all metrics
+    POWER_CMD_QUERY = _POWER_CMD_QUERY
+    POWER_CMD_SET = _POWER_CMD_SET
+    POWER_CMD_SLEEP = _POWER_CMD_SLEEP
+    POWER_CMD_SHUTDOWN = _POWER_CMD_SHUTDOWN
+    POWER_CMD_CURRENT = _POWER_CMD_CURRENT
+    POWER_CMD_BATTERY = _POWER_CMD_BATTERY
+    POWER_CMD_TEMP = _POWER_CMD_TEMP
+    POWER_CMD_VOLTAGE = _POWER_CMD_VOLTAGE
+    POWER_CMD_REQUEST_METRICS = _POWER_CMD_REQUEST_METRICS
+    
+    # Metric names for POWER_CMD_CURRENT..POWER_CMD_VOLTAGE, indexed by
+    # (command - POWER_CMD_CURRENT) >> 4
+    METRIC_NAMES = ('current_ma', 'battery_percent', 'temperature_0_1c', 'voltage_mv')
+    
+    # Parsed form of each power command: (name, data0 key, data1 key)
+    POWER_COMMAND_FIELDS = {
+        _POWER_CMD_QUERY: ('query', 'power_state', 'status_flags'),     # Status query or response
+        _POWER_CMD_SET: ('set_state', 'power_state', 'flags'),          # SoM → RP2040
+        _POWER_CMD_SLEEP: ('sleep', 'delay_seconds', 'sleep_flags'),    # SoM → RP2040
+        # shutdown_mode: 0=normal, 1=emergency, 2=reboot
+        _POWER_CMD_SHUTDOWN: ('shutdown', 'shutdown_mode', 'reason_code'),
+        # metric_mask: which metrics to send (0=all)
+        _POWER_CMD_REQUEST_METRICS: ('request_metrics', 'metric_mask', 'reserved'),
+    }
     
     # Power states
-    POWER_STATE_OFF = 0x00          # System off
-    POWER_STATE_RUNNING = 0x01      # System running
-    POWER_STATE_SUSPEND = 0x02      # System suspended
-    POWER_STATE_SLEEP = 0x03        # Low power sleep
+    POWER_STATE_OFF = _POWER_STATE_OFF
+    POWER_STATE_RUNNING = _POWER_STATE_RUNNING
+    POWER_STATE_SUSPEND = _POWER_STATE_SUSPEND
+    POWER_STATE_SLEEP = _POWER_STATE_SLEEP
+    
+    # System command constants (5 LSB of type_flags)
+    SYSTEM_CMD_PING = _SYSTEM_CMD_PING
+    SYSTEM_CMD_PONG = _SYSTEM_CMD_PONG
+    SYSTEM_CMD_VERSION = _SYSTEM_CMD_VERSION
+    SYSTEM_CMD_RESET = _SYSTEM_CMD_RESET
+    
+    # Names of the data-less system commands, indexed by SYSTEM_CMD_PING..VERSION
+    SYSTEM_COMMAND_NAMES = ('ping', 'pong', 'version_request')
     
     def __init__(self):
         pass
     
-    def calculate_checksum(self, type_flags, data0, data1):
+    # The packet helpers use no instance state. create_packet and the
+    # validators live at module level so the builders and parsers below call
+    # them as plain functions; the class exposes them as static methods.
+    create_packet = staticmethod(_create_packet)
+    validate_packet = staticmethod(_validate_packet)
+    validate_packet_fast = staticmethod(_validate_packet_fast)
+    
+    @staticmethod
+    def calculate_checksum(type_flags, data0, data1):
         """Calculate XOR checksum for packet"""
         return type_flags ^ data0 ^ data1
     
-    def create_packet(self, type_flags, data0=0x00, data1=0x00):
-        """Create a 4-byte protocol packet with checksum"""
-        checksum = self.calculate_checksum(type_flags, data0, data1)
-        return struct.pack('BBBB', type_flags, data0, data1, checksum)
-    
-    def validate_packet(self, packet_bytes):
-        """Validate packet checksum and return parsed data"""
-        if len(packet_bytes) != 4:
-            return False, None
-        
-        type_flags, data0, data1, checksum = struct.unpack('BBBB', packet_bytes)
-        calculated_checksum = self.calculate_checksum(type_flags, data0, data1)
-        
-        if checksum != calculated_checksum:
-            return False, None
-        
-        return True, (type_flags, data0, data1, checksum)
-    
     def create_button_packet(self, up_pressed=False, down_pressed=False, 
                            select_pressed=False, power_pressed=False):
         """Create button event packet according to protocol specification
@@ -97,21 +291,17 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte packet ready for UART transmission
         """
-        # Start with TYPE_BUTTON (0b000xxxxx)
-        type_flags = self.TYPE_BUTTON
-        
-        # Set button state bits in the 5 LSB
-        if up_pressed:
-            type_flags |= self.BTN_UP
-        if down_pressed:
-            type_flags |= self.BTN_DOWN
-        if select_pressed:
-            type_flags |= self.BTN_SELECT
-        if power_pressed:
-            type_flags |= self.BTN_POWER
-        
-        # Data bytes are reserved (set to 0x00 as per spec)
-        return self.create_packet(type_flags, 0x00, 0x00)
+        # Data bytes are reserved (0x00 as per spec), so every packet is one
+        # of the 16 prebuilt ones, indexed by the button bits of type_flags
+        return _BUTTON_PACKETS[self._button_type_flags(up_pressed, down_pressed,
+                                                       select_pressed, power_pressed)]
+    
+    def _button_type_flags(self, up_pressed, down_pressed, select_pressed, power_pressed):
+        """Build the type_flags byte for a button packet"""
+        # TYPE_BUTTON (0b000xxxxx) with the button state bits in the 5 LSB,
+        # shifted into the BTN_UP/DOWN/SELECT/POWER positions (bits 0-3)
+        return (_TYPE_BUTTON | bool(up_pressed) | (bool(down_pressed) << 1)
+                | (bool(select_pressed) << 2) | (bool(power_pressed) << 3))
     
     def parse_button_packet(self, packet_bytes):
         """Parse button packet and return button states
@@ -122,25 +312,27 @@ class PamirUartProtocols:
         Returns:
             tuple: (valid, button_states) where button_states is dict with button states
         """
-        valid, parsed = self.validate_packet(packet_bytes)
+        valid, parsed = _validate_packet(packet_bytes)
         if not valid:
-            return False, None
+            return _FAIL
         
         type_flags, data0, data1, checksum = parsed
         
         # Check if this is a button packet
-        if (type_flags & 0xE0) != self.TYPE_BUTTON:
-            return False, None
-        
-        # Extract button states from the 5 LSB
-        button_states = {
-            'up': bool(type_flags & self.BTN_UP),
-            'down': bool(type_flags & self.BTN_DOWN),
-            'select': bool(type_flags & self.BTN_SELECT),
-            'power': bool(type_flags & self.BTN_POWER)
-        }
+        if (type_flags & 0xE0) != _TYPE_BUTTON:
+            return _FAIL
         
-        return True, button_states
+        return True, self._button_states(type_flags)
+    
+    def _button_states(self, type_flags):
+        """Extract button states from the 5 LSB of a validated button packet"""
+        up, down, select, power = _BUTTON_STATES[type_flags & 0x0F]
+        return {
+            'up': up,
+            'down': down,
+            'select': select,
+            'power': power
+        }
     
     def create_led_packet(self, led_id=0, execute=False, mode=0, r4=0, g4=0, b4=0, time_value=0):
         """Create LED control packet according to protocol specification
@@ -157,21 +349,11 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte packet ready for UART transmission
         """
-        # Start with TYPE_LED (0b001xxxxx)
-        type_flags = self.TYPE_LED
-        
-        # Add execute flag (bit 4)
-        if execute:
-            type_flags |= self.LED_CMD_EXECUTE
-        
-        # Add LED ID (bits 3-0)
-        type_flags |= (led_id & 0x0F)
-        
-        # Pack color data: data[0] = RRRRGGGG, data[1] = BBBBTTTT
-        data0 = ((r4 & 0x0F) << 4) | (g4 & 0x0F)
-        data1 = ((b4 & 0x0F) << 4) | (time_value & 0x0F)
-        
-        return self.create_packet(type_flags, data0, data1)
+        # type_flags = TYPE_LED (0b001xxxxx) | execute flag (bit 4, LED_CMD_EXECUTE)
+        # | LED ID (bits 3-0); data[0] = RRRRGGGG, data[1] = BBBBTTTT
+        return _create_packet(_TYPE_LED | (bool(execute) << 4) | (led_id & 0x0F),
+                              ((r4 & 0x0F) << 4) | (g4 & 0x0F),
+                              ((b4 & 0x0F) << 4) | (time_value & 0x0F))
     
     def create_led_completion_packet(self, led_id, sequence_length):
         """Create LED completion acknowledgment packet according to protocol specification
@@ -184,14 +366,15 @@ class PamirUartProtocols:
             bytes: 4-byte acknowledgment packet ready for UART transmission
         """
         # Start with TYPE_LED | LED_CMD_EXECUTE | LED_ID
-        type_flags = self.TYPE_LED | self.LED_CMD_EXECUTE | (led_id & 0x0F)
+        type_flags = _TYPE_LED | _LED_CMD_EXECUTE | (led_id & 0x0F)
         
         # data[0] = 0xFF (completion indicator as per spec)
         # data[1] = sequence length that was executed
         data0 = 0xFF
-        data1 = min(255, max(0, sequence_length))  # Clamp to byte range
+        # Clamp to byte range
+        data1 = 0 if sequence_length < 0 else (sequence_length if sequence_length < 255 else 255)
         
-        return self.create_packet(type_flags, data0, data1)
+        return _create_packet(type_flags, data0, data1)
     
     def create_led_error_packet(self, led_id, error_code):
         """Create LED error report packet
@@ -204,14 +387,15 @@ class PamirUartProtocols:
             bytes: 4-byte error packet ready for UART transmission
         """
         # Start with TYPE_LED | LED_CMD_EXECUTE | LED_ID
-        type_flags = self.TYPE_LED | self.LED_CMD_EXECUTE | (led_id & 0x0F)
+        type_flags = _TYPE_LED | _LED_CMD_EXECUTE | (led_id & 0x0F)
         
         # data[0] = 0xFE (error indicator)
         # data[1] = error code
         data0 = 0xFE
-        data1 = min(255, max(1, error_code))  # Error codes 1-255
+        # Error codes 1-255
+        data1 = 1 if error_code < 1 else (error_code if error_code < 255 else 255)
         
-        return self.create_packet(type_flags, data0, data1)
+        return _create_packet(type_flags, data0, data1)
     
     def create_led_status_packet(self, led_id, status_code, status_value=0):
         """Create LED status report packet
@@ -225,14 +409,14 @@ class PamirUartProtocols:
             bytes: 4-byte status packet ready for UART transmission
         """
         # Start with TYPE_LED | LED_CMD_EXECUTE | LED_ID
-        type_flags = self.TYPE_LED | self.LED_CMD_EXECUTE | (led_id & 0x0F)
+        type_flags = _TYPE_LED | _LED_CMD_EXECUTE | (led_id & 0x0F)
         
         # data[0] = status code (0x00-0xFD, avoiding 0xFE=error, 0xFF=completion)
         # data[1] = status value
-        data0 = min(0xFD, max(0, status_code))
+        data0 = 0 if status_code < 0 else (status_code if status_code < 0xFD else 0xFD)
         data1 = status_value & 0xFF
         
-        return self.create_packet(type_flags, data0, data1)
+        return _create_packet(type_flags, data0, data1)
     
     def parse_led_packet(self, packet_bytes):
         """Parse LED packet and return LED command data
@@ -243,35 +427,81 @@ class PamirUartProtocols:
         Returns:
             tuple: (valid, led_data) where led_data is dict with LED command info
         """
-        valid, parsed = self.validate_packet(packet_bytes)
+        valid, parsed = _validate_packet(packet_bytes)
         if not valid:
-            return False, None
+            return _FAIL
         
         type_flags, data0, data1, checksum = parsed
         
         # Check if this is an LED packet
-        if (type_flags & 0xE0) != self.TYPE_LED:
-            return False, None
-        
-        # Extract LED command fields
-        execute = bool(type_flags & self.LED_CMD_EXECUTE)
-        led_id = type_flags & 0x0F
+        if (type_flags & 0xE0) != _TYPE_LED:
+            return _FAIL
         
+        return True, self._led_data(type_flags, data0, data1)
+    
+    def _led_data(self, type_flags, data0, data1):
+        """Extract LED command fields from a validated LED packet"""
         # Extract color data
         r4 = (data0 >> 4) & 0x0F
         g4 = data0 & 0x0F
         b4 = (data1 >> 4) & 0x0F
         time_value = data1 & 0x0F
         
-        led_data = {
-            'execute': execute,
-            'led_id': led_id,
+        return {
+            'execute': bool(type_flags & _LED_CMD_EXECUTE),
+            'led_id': type_flags & 0x0F,
             'color': (r4, g4, b4),
             'time_value': time_value,
             'delay_ms': (time_value + 1) * 100
         }
+    
+    def new_led_command(self):
+        """Create an empty LED command record for parse_led_packet_into
         
-        return True, led_data
+        Returns:
+            list: Fixed-size record indexed by the K_* constants, reusable
+                  across packets so LED commands don't allocate
+        """
+        return [_LED_KIND_QUEUE, 0, bytearray(3), 0, 0]
+    
+    def parse_led_packet_into(self, packet_bytes, led_command):
+        """Parse LED packet into an existing LED command record
+        
+        Args:
+            packet_bytes: 4-byte packet from UART
+            led_command: Record from new_led_command, written in place
+            
+        Returns:
+            bool: True if led_command was filled from a valid LED packet
+        """
+        valid, parsed = _validate_packet(packet_bytes)
+        if not valid:
+            return False
+        
+        type_flags, data0, data1, checksum = parsed
+        
+        # Check if this is an LED packet
+        if (type_flags & 0xE0) != _TYPE_LED:
+            return False
+        
+        self._fill_led_command(led_command, type_flags, data0, data1)
+        return True
+    
+    def _fill_led_command(self, led_command, type_flags, data0, data1):
+        """Write LED command fields from a validated LED packet into led_command"""
+        color = led_command[2]
+        color[0] = (data0 >> 4) & 0x0F
+        color[1] = data0 & 0x0F
+        color[2] = (data1 >> 4) & 0x0F
+        
+        if type_flags & _LED_CMD_EXECUTE:
+            led_command[0] = _LED_KIND_EXECUTE
+        else:
+            led_command[0] = _LED_KIND_QUEUE
+        led_command[1] = type_flags & 0x0F
+        led_command[3] = data1 & 0x0F
+        led_command[4] = 0
+        return led_command
     
     def parse_led_acknowledgment(self, packet_bytes):
         """Parse LED acknowledgment/status packet
@@ -282,15 +512,15 @@ class PamirUartProtocols:
         Returns:
             tuple: (valid, ack_data) where ack_data contains acknowledgment info
         """
-        valid, parsed = self.validate_packet(packet_bytes)
+        valid, parsed = _validate_packet(packet_bytes)
         if not valid:
-            return False, None
+            return _FAIL
         
         type_flags, data0, data1, checksum = parsed
         
         # Check if this is an LED packet with execute flag
-        if (type_flags & 0xE0) != self.TYPE_LED or not (type_flags & self.LED_CMD_EXECUTE):
-            return False, None
+        if (type_flags & 0xE0) != _TYPE_LED or not (type_flags & _LED_CMD_EXECUTE):
+            return _FAIL
         
         led_id = type_flags & 0x0F
         
@@ -348,8 +578,8 @@ class PamirUartProtocols:
             bytes: 4-byte packet ready for UART transmission
         """
         # Start with TYPE_POWER (0b010xxxxx) + command in 5 LSB
-        type_flags = self.TYPE_POWER | (command & 0x1F)
-        return self.create_packet(type_flags, data0, data1)
+        type_flags = _TYPE_POWER | (command & 0x1F)
+        return _create_packet(type_flags, data0, data1)
     
     def create_power_metrics_packet_rp2040_to_som(self, metric_type, value_16bit):
         """Create power metrics packet FROM RP2040 TO SoM (Raspberry Pi 5)
@@ -368,13 +598,30 @@ class PamirUartProtocols:
             bytes: 4-byte packet ready for UART transmission
         """
         # Start with TYPE_POWER + metric type
-        type_flags = self.TYPE_POWER | (metric_type & 0x1F)
+        type_flags = _TYPE_POWER | (metric_type & 0x1F)
         
         # Pack 16-bit value as little-endian (low byte first)
         data0 = value_16bit & 0xFF          # Low byte
         data1 = (value_16bit >> 8) & 0xFF   # High byte
         
-        return self.create_packet(type_flags, data0, data1)
+        return _create_packet(type_flags, data0, data1)
+    
+    def create_power_metrics_packet_into(self, buf, metric_type, value_16bit):
+        """Write a power metrics packet into a preallocated buffer
+        
+        Same bytes as create_power_metrics_packet_rp2040_to_som, without
+        allocating a new bytes object.
+        
+        Args:
+            buf: Writable buffer of at least 4 bytes (bytearray or memoryview)
+            metric_type, value_16bit: As for create_power_metrics_packet_rp2040_to_som
+            
+        Returns:
+            buf, filled and ready for UART transmission
+        """
+        pack4(buf, _TYPE_POWER | (metric_type & 0x1F),
+              value_16bit & 0xFF, (value_16bit >> 8) & 0xFF)
+        return buf
     
     def create_power_status_packet_rp2040_to_som(self, power_state, status_flags=0x00):
         """Create power status packet FROM RP2040 TO SoM (Raspberry Pi 5)
@@ -391,8 +638,24 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte packet ready for UART transmission
         """
-        type_flags = self.TYPE_POWER | self.POWER_CMD_QUERY
-        return self.create_packet(type_flags, power_state, status_flags)
+        type_flags = _TYPE_POWER | _POWER_CMD_QUERY
+        return _create_packet(type_flags, power_state, status_flags)
+    
+    def create_power_status_packet_into(self, buf, power_state, status_flags=0x00):
+        """Write a power status packet into a preallocated buffer
+        
+        Same bytes as create_power_status_packet_rp2040_to_som, without
+        allocating a new bytes object.
+        
+        Args:
+            buf: Writable buffer of at least 4 bytes (bytearray or memoryview)
+            power_state, status_flags: As for create_power_status_packet_rp2040_to_som
+            
+        Returns:
+            buf, filled and ready for UART transmission
+        """
+        pack4(buf, _TYPE_POWER | _POWER_CMD_QUERY, power_state, status_flags)
+        return buf
     
     def parse_power_packet(self, packet_bytes):
         """Parse power packet and return power command data
@@ -405,70 +668,40 @@ class PamirUartProtocols:
         Returns:
             tuple: (valid, power_data) where power_data contains command info
         """
-        valid, parsed = self.validate_packet(packet_bytes)
+        valid, parsed = _validate_packet(packet_bytes)
         if not valid:
-            return False, None
+            return _FAIL
         
         type_flags, data0, data1, checksum = parsed
         
         # Check if this is a power packet
-        if (type_flags & 0xE0) != self.TYPE_POWER:
-            return False, None
+        if (type_flags & 0xE0) != _TYPE_POWER:
+            return _FAIL
         
+        return True, self._power_data(type_flags, data0, data1)
+    
+    def _power_data(self, type_flags, data0, data1):
+        """Extract power command data from a validated power packet"""
         # Extract power command from 5 LSB
         command = type_flags & 0x1F
         
-        # Parse based on command type
-        if command == self.POWER_CMD_QUERY:
-            # Status query or response
-            power_data = {
-                'command': 'query',
-                'power_state': data0,
-                'status_flags': data1
-            }
-        elif command == self.POWER_CMD_SET:
-            # Set power state command (SoM → RP2040)
-            power_data = {
-                'command': 'set_state',
-                'power_state': data0,
-                'flags': data1
-            }
-        elif command == self.POWER_CMD_SLEEP:
-            # Enter sleep mode command (SoM → RP2040)
-            power_data = {
-                'command': 'sleep',
-                'delay_seconds': data0,
-                'sleep_flags': data1
-            }
-        elif command == self.POWER_CMD_SHUTDOWN:
-            # Shutdown command (SoM → RP2040)
-            power_data = {
-                'command': 'shutdown',
-                'shutdown_mode': data0,  # 0=normal, 1=emergency, 2=reboot
-                'reason_code': data1
-            }
-        elif command == self.POWER_CMD_REQUEST_METRICS:
-            # Metrics request (SoM → RP2040)
+        # Commands with two plain data fields come from the table
+        fields = self.POWER_COMMAND_FIELDS.get(command)
+        if fields is not None:
+            name, key0, key1 = fields
             power_data = {
-                'command': 'request_metrics',
-                'metric_mask': data0,    # Which metrics to send (0=all)
-                'reserved': data1
+                'command': name,
+                key0: data0,
+                key1: data1
             }
-        elif command in [self.POWER_CMD_CURRENT, self.POWER_CMD_BATTERY, 
-                        self.POWER_CMD_TEMP, self.POWER_CMD_VOLTAGE]:
+        elif (_POWER_CMD_CURRENT <= command <= _POWER_CMD_VOLTAGE
+              and not command & 0x0F):
             # Metrics response (RP2040 → SoM)
             value_16bit = data0 | (data1 << 8)  # Little-endian reconstruction
             
-            metric_names = {
-                self.POWER_CMD_CURRENT: 'current_ma',
-                self.POWER_CMD_BATTERY: 'battery_percent',
-                self.POWER_CMD_TEMP: 'temperature_0_1c',
-                self.POWER_CMD_VOLTAGE: 'voltage_mv'
-            }
-            
             power_data = {
                 'command': 'metrics_response',
-                'metric_type': metric_names.get(command, 'unknown'),
+                'metric_type': self.METRIC_NAMES[(command - _POWER_CMD_CURRENT) >> 4],
                 'value': value_16bit
             }
         else:
@@ -480,7 +713,7 @@ class PamirUartProtocols:
                 'data1': data1
             }
         
-        return True, power_data
+        return power_data
     
     def get_packet_type(self, packet_bytes):
         """Get the message type from a packet
@@ -505,7 +738,7 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte ping packet ready for UART transmission
         """
-        return self.create_packet(0xC0, 0x00, 0x00)
+        return _PING_PACKET
     
     def create_system_pong_packet(self):
         """Create system pong response packet FROM RP2040 TO SoM
@@ -513,7 +746,7 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte pong packet ready for UART transmission
         """
-        return self.create_packet(0xC0, 0x01, 0x00)
+        return _PONG_PACKET
     
     def create_firmware_version_packet(self):
         """Create firmware version packet FROM RP2040 TO SoM
@@ -521,11 +754,8 @@ class PamirUartProtocols:
         Returns:
             bytes: 4-byte version packet ready for UART transmission
         """
-        # Pack version as: MAJOR.MINOR.PATCH into 2 bytes
-        # data[0] = MAJOR (8 bits), data[1] = MINOR (4 bits) | PATCH (4 bits)
-        version_data0 = self.FIRMWARE_VERSION_MAJOR & 0xFF
-        version_data1 = ((self.FIRMWARE_VERSION_MINOR & 0x0F) << 4) | (self.FIRMWARE_VERSION_PATCH & 0x0F)
-        return self.create_packet(0xC2, version_data0, version_data1)
+        # MAJOR.MINOR.PATCH packed into 2 bytes, precomputed at import
+        return _VERSION_PACKET
     
     def parse_system_packet(self, packet_bytes):
         """Parse system packet and return system command data
@@ -536,29 +766,27 @@ class PamirUartProtocols:
         Returns:
             tuple: (valid, system_data) where system_data contains command info
         """
-        valid, parsed = self.validate_packet(packet_bytes)
+        valid, parsed = _validate_packet(packet_bytes)
         if not valid:
-            return False, None
+            return _FAIL
         
         type_flags, data0, data1, checksum = parsed
         
         # Check if this is a system packet
         if (type_flags & 0xE0) != 0xC0:
-            return False, None
+            return _FAIL
         
+        return True, self._system_data(type_flags, data0, data1)
+    
+    def _system_data(self, type_flags, data0, data1):
+        """Extract system command data from a validated system packet"""
         # Extract system command from full type_flags
         command = type_flags & 0x1F
         
-        if command == 0x00:
-            # Ping command
-            system_data = {'command': 'ping'}
-        elif command == 0x01:
-            # Pong response
-            system_data = {'command': 'pong'}
-        elif command == 0x02:
-            # Version request
-            system_data = {'command': 'version_request'}
-        elif command == 0x03:
+        if command <= _SYSTEM_CMD_VERSION:
+            # Ping, pong or version request, named by table
+            system_data = {'command': self.SYSTEM_COMMAND_NAMES[command]}
+        elif command == _SYSTEM_CMD_RESET:
             # Reset command
             system_data = {'command': 'reset', 'reset_type': data0}
         else:
@@ -570,4 +798,53 @@ class PamirUartProtocols:
                 'data1': data1
             }
         
-        return True, system_data
\ No newline at end of file
+        return system_data
+    
+    # ==================== PACKET DECODING ====================
+    
+    def decode(self, packet_bytes, led_command=None):
+        """Validate a packet once and parse it according to its message type
+        
+        Args:
+            packet_bytes: 4-byte packet from UART; the length is not checked
+            led_command: Optional record to fill for LED packets, as for
+                         parse_led_packet_into; a new one is created if None
+            
+        Returns:
+            tuple: (type_code, payload) where type_code is the message type
+                   (3 MSB of type_flags) and payload is:
+                   - LED: the LED command record
+                   - Power/system: (command, data0, data1), command being
+                     the 5 LSB of type_flags (POWER_CMD_*/SYSTEM_CMD_*)
+                   - Button: the pressed mask (BTN_* bits, type_flags & 0x0F)
+                   - Other types: None
+                   (None, None) if the packet is invalid.
+        """
+        if not validate4(packet_bytes, 0):
+            return _INVALID
+        
+        return self.decode_trusted(packet_bytes, led_command)
+    
+    def decode_trusted(self, packet_bytes, led_command=None):
+        """Parse a packet whose checksum has already been checked
+        
+        For packets validated upstream, e.g. RX ring slots filled by a drain
+        that only queues good packets. Arguments and return value are as for
+        decode, except that the packet is never reported invalid.
+        """
+        type_flags = packet_bytes[0]
+        type_code = type_flags & 0xE0
+        
+        if type_code == _TYPE_LED:
+            if led_command is None:
+                led_command = self.new_led_command()
+            payload = self._fill_led_command(led_command, type_flags,
+                                             packet_bytes[1], packet_bytes[2])
+        elif type_code == _TYPE_POWER or type_code == _TYPE_SYSTEM:
+            payload = (type_flags & 0x1F, packet_bytes[1], packet_bytes[2])
+        elif type_code == _TYPE_BUTTON:
+            payload = type_flags & 0x0F
+        else:
+            payload = None
+        
+        return type_code, payload
\ No newline at end of file
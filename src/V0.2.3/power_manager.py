@@ -80,24 +80,61 @@ class PowerManager:
                 print(f"[PowerManager] {sensor_name} read failed: {e}")
             return fallback_value
     
-    def get_current_ma(self):
-        """Get current draw in milliamps from BQ27441
+    def _read_metric(self, kind):
+        """Read one metric from the BQ27441, convert it and cache it
         
+        Args:
+            kind: Key into _SENSORS (same as the get_all_metrics keys)
+            
         Returns:
-            int: Current draw in mA (positive = charging, negative = discharging)
-                 Returns 0 if sensor read fails
+            int: Converted sensor value, or 0 if the read or conversion fails
         """
-        current_ma = self._read_sensor_safe(
-            self.bq27441.avg_current_mA, 
-            "Current", 
+        method_name, sensor_name, cache_attr, convert = self._SENSORS[kind]
+        bq = self.bq27441
+        value = self._read_sensor_safe(
+            getattr(bq, method_name) if bq is not None else None,
+            sensor_name,
             0
         )
         
+        if value == 0:
+            return 0
+        
+        if convert is not None:
+            try:
+                value = convert(self, value)
+            except Exception as e:
+                if self.debug_enabled:
+                    print(f"[PowerManager] {sensor_name} conversion failed: {e}")
+                return 0
+        
         # Cache the value for backup
-        if current_ma != 0:
-            self.cached_current_ma = current_ma
-            
-        return current_ma
+        setattr(self, cache_attr, value)
+        return value
+    
+    def _capacity_to_percent(self, remain_capacity_mah):
+        """Convert remaining capacity in mAh to 0-100% of design capacity"""
+        # Integer math, the RP2040 has no FPU
+        battery_percent = (remain_capacity_mah * 100) // self.design_capacity_mah
+        return max(0, min(100, battery_percent))  # Clamp to 0-100%
+    
+    # Metric -> (BQ27441 method, debug name, cache attribute, conversion or None)
+    _SENSORS = {
+        'current_ma': ('avg_current_mA', 'Current', 'cached_current_ma', None),
+        'battery_percent': ('remain_capacity', 'Battery Capacity', 'cached_battery_percent',
+                            _capacity_to_percent),
+        'temperature_0_1c': ('temp_0_1C', 'Temperature', 'cached_temperature_0_1c', None),
+        'voltage_mv': ('voltage_mV', 'Voltage', 'cached_voltage_mv', None),
+    }
+    
+    def get_current_ma(self):
+        """Get current draw in milliamps from BQ27441
+        
+        Returns:
+            int: Current draw in mA (positive = charging, negative = discharging)
+                 Returns 0 if sensor read fails
+        """
+        return self._read_metric('current_ma')
     
     def get_battery_percent(self):
         """Get battery charge percentage from BQ27441
@@ -105,29 +142,7 @@ class PowerManager:
         Returns:
             int: Battery percentage (0-100%), returns 0 if sensor read fails
         """
-        # Read remaining capacity in mAh
-        remain_capacity_mah = self._read_sensor_safe(
-            self.bq27441.remain_capacity,
-            "Battery Capacity",
-            0
-        )
-        
-        if remain_capacity_mah == 0:
-            return 0
-        
-        # Convert to percentage based on design capacity
-        try:
-            battery_percent = int((remain_capacity_mah / self.design_capacity_mah) * 100)
-            battery_percent = max(0, min(100, battery_percent))  # Clamp to 0-100%
-            
-            # Cache the value
-            self.cached_battery_percent = battery_percent
-            return battery_percent
-            
-        except Exception as e:
-            if self.debug_enabled:
-                print(f"[PowerManager] Battery percentage calculation failed: {e}")
-            return 0
+        return self._read_metric('battery_percent')
     
     def get_temperature_0_1c(self):
         """Get temperature in 0.1°C resolution from BQ27441
@@ -136,27 +151,7 @@ class PowerManager:
             int: Temperature in 0.1°C units (e.g., 251 = 25.1°C)
                  Returns 0 if sensor read fails
         """
-        temp_celsius = self._read_sensor_safe(
-            self.bq27441.temp_C,
-            "Temperature",
-            0.0
-        )
-        
-        if temp_celsius == 0.0:
-            return 0
-        
-        # Convert to 0.1°C resolution
-        try:
-            temp_0_1c = int(temp_celsius * 10)
-            
-            # Cache the value
-            self.cached_temperature_0_1c = temp_0_1c
-            return temp_0_1c
-            
-        except Exception as e:
-            if self.debug_enabled:
-                print(f"[PowerManager] Temperature conversion failed: {e}")
-            return 0
+        return self._read_metric('temperature_0_1c')
     
     def get_voltage_mv(self):
         """Get voltage in millivolts from BQ27441
@@ -165,27 +160,7 @@ class PowerManager:
             int: Voltage in mV (e.g., 3800 = 3.8V)
                  Returns 0 if sensor read fails
         """
-        voltage_v = self._read_sensor_safe(
-            self.bq27441.voltage_V,
-            "Voltage",
-            0.0
-        )
-        
-        if voltage_v == 0.0:
-            return 0
-        
-        # Convert to millivolts
-        try:
-            voltage_mv = int(voltage_v * 1000)
-            
-            # Cache the value
-            self.cached_voltage_mv = voltage_mv
-            return voltage_mv
-            
-        except Exception as e:
-            if self.debug_enabled:
-                print(f"[PowerManager] Voltage conversion failed: {e}")
-            return 0
+        return self._read_metric('voltage_mv')
     
     def get_all_metrics(self):
         """Get all power metrics in one call
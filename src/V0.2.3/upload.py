@@ -345,7 +345,8 @@ def compile_python_files():
                 mpy_filename = filename[:-3] + '.mpy'  # Replace .py with .mpy
                 mpy_path = script_dir / mpy_filename
                 
-                cmd = ['mpy-cross', str(file_path), '-o', str(mpy_path)]
+                # -march is required for the @micropython.viper/native code
+                cmd = ['mpy-cross', '-march=armv6m', str(file_path), '-o', str(mpy_path)]
                 result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
                 
                 if result.returncode != 0: